@@ -1,13 +1,17 @@
 #cython: language_level=3
-import json
 import re
+import sys
 from decimal import Decimal
 from ipaddress import IPv4Address, IPv6Address
 from uuid import UUID
 
-from cpython cimport PyList_Append, PyUnicode_AsEncodedString, PyUnicode_Join
+cimport cython
+from cpython cimport PyList_Append, PyUnicode_AsEncodedString
+from cpython.bytearray cimport PyByteArray_AS_STRING, PyByteArray_Resize
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_FromStringAndSize, PyBytes_GET_SIZE
 from cpython.datetime cimport date, datetime
 from cpython.mem cimport PyMem_Free, PyMem_Malloc
+from libc.string cimport memchr, memcpy
 from libc.stdint cimport (
     int8_t,
     int16_t,
@@ -22,22 +26,48 @@ from libc.stdint cimport (
 from aiochclient.exceptions import ChClientError
 
 
+# Clickhouse always sends dates in fixed width format,
+# so slicing is much faster than strptime here
+
 cdef datetime _datetime_parse(str string):
-    return datetime.strptime(string, '%Y-%m-%d %H:%M:%S')
+    return datetime(
+        int(string[0:4]),
+        int(string[5:7]),
+        int(string[8:10]),
+        int(string[11:13]),
+        int(string[14:16]),
+        int(string[17:19]),
+    )
 
 cdef datetime _datetime_parse_f(str string):
-    return datetime.strptime(string, '%Y-%m-%d %H:%M:%S.%f')
+    return datetime(
+        int(string[0:4]),
+        int(string[5:7]),
+        int(string[8:10]),
+        int(string[11:13]),
+        int(string[14:16]),
+        int(string[17:19]),
+        int(string[20:26].ljust(6, "0")),
+    )
 
 cdef date _date_parse(str string):
-    return datetime.strptime(string, '%Y-%m-%d')
+    return datetime(int(string[0:4]), int(string[5:7]), int(string[8:10]))
 
 
 try:
     import ciso8601
 except ImportError:
-    date_parse = _date_parse
-    datetime_parse = _datetime_parse
-    datetime_parse_f = _datetime_parse_f
+    # fromisoformat is faster than slicing, but parses
+    # fractions of any length only since python 3.11
+    if sys.version_info >= (3, 7):
+        date_parse = datetime_parse = datetime.fromisoformat
+    else:
+        date_parse = _date_parse
+        datetime_parse = _datetime_parse
+    if sys.version_info >= (3, 11):
+        datetime_parse_f = datetime.fromisoformat
+    else:
+        datetime_parse_f = _datetime_parse_f
 else:
     date_parse = datetime_parse = datetime_parse_f = ciso8601.parse_datetime
 
@@ -47,7 +77,14 @@ cdef extern from *:
     ctypedef int uint128 "__uint128_t"
 
 
-__all__ = ["what_py_converter", "rows2ch", "json2ch", "py2ch"]
+__all__ = [
+    "what_py_converter",
+    "cached_converter",
+    "decode_row",
+    "rows2ch",
+    "json2ch",
+    "py2ch",
+]
 
 
 DEF DQ = "'"
@@ -64,7 +101,13 @@ RE_NESTED = re.compile(r"^Nested\((.*)\)$")
 RE_NULLABLE = re.compile(r"^Nullable\((.*)\)$")
 RE_LOW_CARDINALITY = re.compile(r"^LowCardinality\((.*)\)$")
 RE_MAP = re.compile(r"^Map\((.*)\)$")
-RE_REPLACE_QUOTE = re.compile(r"(?<!\\)'")
+RE_AGGREGATE = re.compile(r",(.*)\)")
+
+# Max number of distinct values remembered by a cached converter,
+# values seen after that are converted every time
+DEF LOW_CARDINALITY_CACHE_SIZE = 10000
+# SafeUUID.unknown, is_safe does not exist before python 3.7
+cdef object UUID_SAFE_UNKNOWN = getattr(UUID(int=0), "is_safe", None)
 
 
 cdef str remove_single_quotes(str string):
@@ -83,9 +126,13 @@ cdef str decode(char* val):
         int current_chr
         str result
         Py_ssize_t i, current_i = 0, length = len(val)
-        char* c_value_buffer = <char *> PyMem_Malloc(length * sizeof(char))
+        char* c_value_buffer
         bint escape = False
 
+    if memchr(val, ord("\\"), length) == NULL:
+        # Nothing to unescape, skip the intermediate buffer
+        return val[:length].decode()
+    c_value_buffer = <char *> PyMem_Malloc(length * sizeof(char))
     try:
         for i in range(length):
             current_chr = val[i]
@@ -126,43 +173,103 @@ cdef str decode(char* val):
         PyMem_Free(c_value_buffer)
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
 cdef list seq_parser(str raw):
     """
-    Function for parsing tuples and arrays
+    Function for parsing tuples and arrays,
+    raw[i] is always in range so index checks are off
     """
     cdef:
-        list res = [], cur = []
-        bint in_str = False, in_arr = False, in_tup = False, escape_char = False
-    if not raw:
+        list res = []
+        Py_UCS4 sym
+        Py_ssize_t i, start = 0, depth = 0, length = len(raw)
+        bint in_str = False, escape_char = False
+    if not length:
         return res
-    for sym in raw:
-        if not (in_str or in_arr or in_tup):
-            if sym == CM:
-                PyList_Append(res, PyUnicode_Join("", cur))
-                del cur[:]
-                continue
+    for i in range(length):
+        sym = raw[i]
+        if in_str:
+            if escape_char:
+                escape_char = False
+            elif sym == ESCAPE_OP:
+                escape_char = True
             elif sym == DQ:
-                in_str = not in_str
-            elif sym == ARR_OP:
-                in_arr = True
-            elif sym == TUP_OP:
-                in_tup = True
-        elif in_str and sym == DQ:
-            if not escape_char:
-                in_str = not in_str
-        elif in_arr and sym == ARR_CLS:
-            in_arr = False
-        elif in_tup and sym == TUP_CLS:
-            in_tup = False
-        if in_str and sym == ESCAPE_OP:
-            escape_char = not escape_char
-        else:
-            escape_char = False
-        PyList_Append(cur, sym)
-    PyList_Append(res, PyUnicode_Join("", cur))
+                in_str = False
+        elif sym == CM:
+            if not depth:
+                PyList_Append(res, raw[start:i])
+                start = i + 1
+        elif sym == DQ:
+            in_str = True
+        elif sym == ARR_OP or sym == TUP_OP:
+            depth += 1
+        elif sym == ARR_CLS or sym == TUP_CLS:
+            depth -= 1
+    PyList_Append(res, raw[start:])
     return res
 
 
+cdef int64_t parse_int(bytes value) except? -1:
+    """
+    Parses integers up to 18 digits without leaving C,
+    anything else goes to python int
+    """
+    cdef:
+        const char* buf = value
+        Py_ssize_t i, start = 0, length = len(value)
+        int64_t result = 0
+        char c
+    if length and buf[0] == c'-':
+        start = 1
+    if length <= start or length - start > 18:
+        return int(value)
+    for i in range(start, length):
+        c = buf[i]
+        if c < c'0' or c > c'9':
+            return int(value)
+        result = result * 10 + (c - c'0')
+    return -result if start else result
+
+
+cdef object parse_uuid(bytes value):
+    """
+    Parses canonical UUID text from clickhouse in C,
+    anything else goes to python UUID
+    """
+    cdef:
+        const char* buf = value
+        uint64_t halves[2]
+        Py_ssize_t i, n = 0
+        char c
+        int digit
+        object uuid
+    if len(value) != 36:
+        return UUID(value.decode())
+    halves[0] = halves[1] = 0
+    for i in range(36):
+        c = buf[i]
+        if i == 8 or i == 13 or i == 18 or i == 23:
+            if c != c'-':
+                return UUID(value.decode())
+            continue
+        if c'0' <= c <= c'9':
+            digit = c - c'0'
+        elif c'a' <= c <= c'f':
+            digit = c - c'a' + 10
+        elif c'A' <= c <= c'F':
+            digit = c - c'A' + 10
+        else:
+            return UUID(value.decode())
+        halves[n >> 4] = (halves[n >> 4] << 4) | digit
+        n += 1
+    # Same as UUID.__setstate__, skips validation in UUID.__init__
+    uuid = UUID.__new__(UUID)
+    object.__setattr__(uuid, "int", (<object>halves[0] << 64) | halves[1])
+    object.__setattr__(uuid, "is_safe", UUID_SAFE_UNKNOWN)
+    return uuid
+
+
 cdef class StrType:
 
     cdef:
@@ -183,7 +290,7 @@ cdef class StrType:
         return self._convert(string)
 
     cpdef str convert(self, bytes value):
-        return self._convert(decode(value))
+        return decode(value)
 
 
 cdef class BoolType:
@@ -222,7 +329,7 @@ cdef class Int8Type:
         return int(string)
 
     cpdef int8_t convert(self, bytes value):
-        return int(value)
+        return parse_int(value)
 
 
 cdef class Int16Type:
@@ -239,7 +346,7 @@ cdef class Int16Type:
         return int(string)
 
     cpdef int16_t convert(self, bytes value):
-        return int(value)
+        return parse_int(value)
 
 
 cdef class Int32Type:
@@ -256,7 +363,7 @@ cdef class Int32Type:
         return int(string)
 
     cpdef int32_t convert(self, bytes value):
-        return int(value)
+        return parse_int(value)
 
 
 cdef class Int64Type:
@@ -273,7 +380,7 @@ cdef class Int64Type:
         return int(string)
 
     cpdef int64_t convert(self, bytes value):
-        return int(value)
+        return parse_int(value)
 
 
 cdef class Int128Type:
@@ -324,7 +431,7 @@ cdef class UInt8Type:
         return int(string)
 
     cpdef uint8_t convert(self, bytes value):
-        return int(value)
+        return parse_int(value)
 
 
 cdef class UInt16Type:
@@ -341,7 +448,7 @@ cdef class UInt16Type:
         return int(string)
 
     cpdef uint16_t convert(self, bytes value):
-        return int(value)
+        return parse_int(value)
 
 
 cdef class UInt32Type:
@@ -358,7 +465,7 @@ cdef class UInt32Type:
         return int(string)
 
     cpdef uint32_t convert(self, bytes value):
-        return int(value)
+        return parse_int(value)
 
 
 cdef class UInt64Type:
@@ -440,7 +547,8 @@ cdef class DateType:
         self.container = container
 
     cdef object _convert(self, str string):
-        string = string.strip("'")
+        if self.container:
+            string = string[1:-1]
         try:
             return date_parse(string).date()
         except ValueError:
@@ -467,7 +575,8 @@ cdef class DateTimeType:
         self.container = container
 
     cdef object _convert(self, str string):
-        string = string.strip("'")
+        if self.container:
+            string = string[1:-1]
         try:
             return datetime_parse(string)
         except ValueError:
@@ -494,7 +603,8 @@ cdef class DateTime64Type:
         self.container = container
 
     cdef object _convert(self, str string):
-        string = string.strip("'")
+        if self.container:
+            string = string[1:-1]
         try:
             return datetime_parse_f(string)
         except ValueError:
@@ -520,14 +630,14 @@ cdef class TupleType:
     def __cinit__(self, str name, bint container):
         self.name = name
         self.container = container
-        cdef str tps = RE_TUPLE.findall(name)[0]
+        cdef str tps = RE_TUPLE.match(name).group(1)
         self.types = tuple(what_py_type(tp.rpartition(" ")[2], container=True).p_type for tp in tps.split(","))
 
     cdef tuple _convert(self, str string):
-        return tuple(
-            tp(val)
-            for tp, val in zip(self.types, seq_parser(string[1:-1]))
-        )
+        cdef:
+            list values = seq_parser(string[1:-1])
+            Py_ssize_t i, n = min(len(self.types), len(values))
+        return tuple([self.types[i](values[i]) for i in range(n)])
 
     cpdef tuple p_type(self, str string):
         return self._convert(string)
@@ -547,7 +657,7 @@ cdef class MapType:
     def __cinit__(self, str name, bint container):
         self.name = name
         self.container = container
-        tps = RE_MAP.findall(name)[0]
+        tps = RE_MAP.match(name).group(1)
         comma_index = tps.index(",")
         self.key_type = what_py_type(tps[:comma_index], container=True)
         self.value_type = what_py_type(tps[comma_index + 1:], container=True)
@@ -576,11 +686,11 @@ cdef class ArrayType:
         self.name = name
         self.container = container
         self.type = what_py_type(
-            RE_ARRAY.findall(name)[0], container=True
+            RE_ARRAY.match(name).group(1), container=True
         )
 
     cdef list _convert(self, str string):
-        return [self.type.p_type(val) for val in seq_parser(string[1:-1])]
+        return list(map(self.type.p_type, seq_parser(string[1:-1])))
 
     cpdef list p_type(self, str string):
         return self._convert(string)
@@ -601,7 +711,7 @@ cdef class NestedType:
         self.container = container
         self.types = tuple(
             what_py_type(i.split()[1], container=True)
-            for i in RE_NESTED.findall(name)[0].split(',')
+            for i in RE_NESTED.match(name).group(1).split(',')
         )
 
     cdef list _convert(self, str string):
@@ -611,7 +721,7 @@ cdef class NestedType:
         result = []
         for val in seq_parser(string[1:-1]):
             temp = []
-            for tp, elem in zip(self.types, seq_parser(val.strip("()"))):
+            for tp, elem in zip(self.types, seq_parser(val[1:-1])):
                 temp.append(tp.p_type(elem))
             result.append(tuple(temp))
         return result
@@ -629,10 +739,11 @@ cdef class NullableType:
     def __cinit__(self, str name, bint container):
         self.name = name
         self.container = container
-        self.type = what_py_type(RE_NULLABLE.findall(name)[0], container)
+        self.type = what_py_type(RE_NULLABLE.match(name).group(1), container)
 
     cdef _convert(self, str string):
-        if string == r"\N" or string == "NULL":
+        # Inside containers NULL is unquoted, so it can't be a string
+        if string == "NULL" or string == r"\N":
             return None
         return self.type.p_type(string)
 
@@ -640,7 +751,10 @@ cdef class NullableType:
         return self._convert(string)
 
     cpdef object convert(self, bytes value):
-        return self._convert(decode(value))
+        # In TSV NULL is always \N, while "NULL" may be a string value
+        if value == b"\\N":
+            return None
+        return self.type.convert(value)
 
 
 cdef class NothingType:
@@ -671,13 +785,15 @@ cdef class UUIDType:
         self.container = container
 
     cdef object _convert(self, str string):
-        return UUID(string.strip("'"))
+        if self.container:
+            string = string[1:-1]
+        return parse_uuid(string.encode())
 
     cpdef object p_type(self, str string):
         return self._convert(string)
 
     cpdef object convert(self, bytes value):
-        return self._convert(value.decode())
+        return parse_uuid(value)
 
 
 cdef class IPv4Type:
@@ -691,7 +807,9 @@ cdef class IPv4Type:
         self.container = container
 
     cdef object _convert(self, str string):
-        return IPv4Address(string.strip("'"))
+        if self.container:
+            string = string[1:-1]
+        return IPv4Address(string)
 
     cpdef object p_type(self, str string):
         return self._convert(string)
@@ -711,7 +829,9 @@ cdef class IPv6Type:
         self.container = container
 
     cdef object _convert(self, str string):
-        return IPv6Address(string.strip("'"))
+        if self.container:
+            string = string[1:-1]
+        return IPv6Address(string)
 
     cpdef object p_type(self, str string):
         return self._convert(string)
@@ -730,7 +850,7 @@ cdef class LowCardinalityType:
     def __cinit__(self, str name, bint container):
         self.name = name
         self.container = container
-        self.type = what_py_type(RE_LOW_CARDINALITY.findall(name)[0], container)
+        self.type = what_py_type(RE_LOW_CARDINALITY.match(name).group(1), container)
 
     cdef _convert(self, str string):
         return self.type.p_type(string)
@@ -739,7 +859,7 @@ cdef class LowCardinalityType:
         return self._convert(string)
 
     cpdef object convert(self, bytes value):
-        return self._convert(decode(value))
+        return self.type.convert(value)
 
 
 cdef class DecimalType:
@@ -798,15 +918,64 @@ cdef dict CH_TYPES_MAPPING = {
     "Nested": NestedType,
 }
 
+# Types without any state except of container flag can be shared
+cdef tuple SCALAR_TYPES = (
+    BoolType,
+    UInt8Type,
+    UInt16Type,
+    UInt32Type,
+    UInt64Type,
+    Int8Type,
+    Int16Type,
+    Int32Type,
+    Int64Type,
+    Int128Type,
+    Int256Type,
+    FloatType,
+    StrType,
+    DateType,
+    DateTimeType,
+    DateTime64Type,
+    UUIDType,
+    IPv4Type,
+    IPv6Type,
+    DecimalType,
+    NothingType,
+)
+
+cdef dict SCALAR_TYPES_INSTANCES = {
+    (ch_type, container): tp(ch_type, container=container)
+    for ch_type, tp in CH_TYPES_MAPPING.items()
+    if tp in SCALAR_TYPES
+    for container in (False, True)
+}
+
+# Parsed types by (name, container), shared between queries
+DEF TYPES_CACHE_SIZE = 512
+cdef dict TYPES_CACHE = {}
+
 
 cdef what_py_type(str name, bint container = False):
     """ Returns needed type class from clickhouse type name """
+    key = (name, container)
+    tp = TYPES_CACHE.get(key)
+    if tp is None:
+        tp = _what_py_type(name, container)
+        if len(TYPES_CACHE) < TYPES_CACHE_SIZE:
+            TYPES_CACHE[key] = tp
+    return tp
+
+
+cdef _what_py_type(str name, bint container):
     name = name.strip()
     try:
         if name.startswith('SimpleAggregateFunction') or name.startswith('AggregateFunction'):
-            ch_type = re.findall(r',(.*)\)', name)[0].strip()
+            ch_type = RE_AGGREGATE.search(name).group(1).strip()
         else:
             ch_type = name.split("(")[0]
+        instance = SCALAR_TYPES_INSTANCES.get((ch_type, container))
+        if instance is not None:
+            return instance
         return CH_TYPES_MAPPING[ch_type](name, container=container)
     except KeyError:
         raise ChClientError(f"Unrecognized type name: '{name}'")
@@ -817,19 +986,49 @@ cpdef what_py_converter(str name, bint container = False):
     return what_py_type(name, container).convert
 
 
-cdef bytes unconvert_str(str value):
+def cached_converter(converter):
+    """ Returns converter sharing one object per distinct raw value.
+    Made per query for LowCardinality columns, so values are not
+    built again for every row and are not kept after the query """
+    cdef dict cache = {}
+
+    def convert(bytes value):
+        try:
+            return cache[value]
+        except KeyError:
+            converted = converter(value)
+            if len(cache) < LOW_CARDINALITY_CACHE_SIZE:
+                cache[value] = converted
+            return converted
+
+    return convert
+
+
+cpdef tuple decode_row(list converters, bytes row):
+    """ Splits raw TSV row and converts every field with its converter """
     cdef:
-        list res = ["'"]
-        int i, sl = len(value)
-    for i in range(sl):
-        if value[i] == "\\":
-            res.append("\\\\")
-        elif value[i] == "'":
-            res.append("\\'")
-        else:
-            res.append(value[i])
-    res.append("'")
-    return PyUnicode_AsEncodedString(PyUnicode_Join("", res), NULL, NULL)
+        const char* buf = row
+        const char* tab
+        Py_ssize_t i, start = 0, end, length = len(row)
+        Py_ssize_t n = len(converters)
+        list values = [None] * n
+    # Fields are sliced right before conversion, without
+    # building an intermediate list of all of them
+    for i in range(n):
+        tab = <const char*>memchr(buf + start, c'\t', length - start)
+        end = tab - buf if tab != NULL else length
+        values[i] = converters[i](buf[start:end])
+        if tab == NULL:
+            return tuple(values[:i + 1])
+        start = end + 1
+    return tuple(values)
+
+
+cdef bytes unconvert_str(str value):
+    # Most strings have nothing to escape
+    if "\\" in value or "'" in value:
+        value = value.replace("\\", "\\\\").replace("'", "\\'")
+    return PyUnicode_AsEncodedString(f"'{value}'", NULL, NULL)
 
 
 cdef bytes unconvert_bool(object value):
@@ -847,7 +1046,7 @@ cdef bytes unconvert_float(double value):
 
 
 cdef bytes unconvert_date(object value):
-    return f"'{value}'".encode('latin-1')
+    return f"'{value.isoformat()}'".encode('latin-1')
 
 
 cdef bytes unconvert_datetime(object value):
@@ -855,17 +1054,17 @@ cdef bytes unconvert_datetime(object value):
 
 
 cdef bytes unconvert_tuple(tuple value):
-    return b"(" + b",".join(py2ch(elem) for elem in value) + b")"
+    return b"(%b)" % b",".join([py2ch(elem) for elem in value])
 
 cdef bytes unconvert_dict(dict value):
     return (
         b"{" +
-        b','.join(py2ch(key) + b':' + py2ch(val) for key, val in value.items()) +
+        b','.join([py2ch(key) + b':' + py2ch(val) for key, val in value.items()]) +
         b"}"
     )
 
 cdef bytes unconvert_array(list value):
-    return b"[" + b",".join(py2ch(elem) for elem in value) + b"]"
+    return b"[%b]" % b",".join([py2ch(elem) for elem in value])
 
 
 cdef bytes unconvert_nullable(object value):
@@ -903,8 +1102,23 @@ cdef dict PY_TYPES_MAPPING = {
 
 
 cpdef bytes py2ch(value):
+    cdef type tp = type(value)
+    # Most common types go straight to cdef functions
+    # without a dict lookup and a python call
+    if tp is int:
+        return unconvert_int(value)
+    if tp is str:
+        return unconvert_str(value)
+    if tp is float:
+        return unconvert_float(value)
+    if value is None:
+        return unconvert_nullable(value)
+    if tp is tuple:
+        return unconvert_tuple(value)
+    if tp is list:
+        return unconvert_array(value)
     try:
-        return PY_TYPES_MAPPING[type(value)](value)
+        return PY_TYPES_MAPPING[tp](value)
     except KeyError:
         raise ChClientError(
             f"Unrecognized type: '{type(value)}'. "
@@ -913,8 +1127,42 @@ cpdef bytes py2ch(value):
             f"No subclasses yet."
         )
 
+cdef inline Py_ssize_t write_buf(
+    bytearray out, Py_ssize_t pos, const char* data, Py_ssize_t size
+) except -1:
+    cdef Py_ssize_t cap = len(out)
+    if pos + size > cap:
+        while pos + size > cap:
+            cap *= 2
+        PyByteArray_Resize(out, cap)
+    memcpy(PyByteArray_AS_STRING(out) + pos, data, size)
+    return pos + size
+
+
 def rows2ch(*rows):
-    return b",".join(unconvert_tuple(tuple(row)) for row in rows)
+    # All rows are written into one growing buffer
+    # instead of joining a bytes object per row
+    cdef:
+        bytearray out = bytearray(1 << 16)
+        Py_ssize_t pos = 0
+        bint first_row = True, first_value
+        bytes value_bytes
+    for row in rows:
+        if not first_row:
+            pos = write_buf(out, pos, b",", 1)
+        first_row = False
+        pos = write_buf(out, pos, b"(", 1)
+        first_value = True
+        for value in row:
+            if not first_value:
+                pos = write_buf(out, pos, b",", 1)
+            first_value = False
+            value_bytes = py2ch(value)
+            pos = write_buf(
+                out, pos, PyBytes_AS_STRING(value_bytes), PyBytes_GET_SIZE(value_bytes)
+            )
+        pos = write_buf(out, pos, b")", 1)
+    return PyBytes_FromStringAndSize(PyByteArray_AS_STRING(out), pos)
 
 
 def json2ch(*records, dumps):
@@ -1,13 +1,31 @@
-import json as json_
+import datetime as dt
+import re
 import warnings
 from enum import Enum
+from functools import lru_cache
 from types import TracebackType
-from typing import Any, AsyncGenerator, BinaryIO, Dict, List, Optional, Type
+from typing import (
+    Any,
+    AsyncGenerator,
+    BinaryIO,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+from uuid import UUID
 
 from aiochclient.exceptions import ChClientError
 from aiochclient.http_clients.abc import HttpClientABC
-from aiochclient.records import FromJsonFabric, Record, RecordsFabric
-from aiochclient.sql import sqlparse
+from aiochclient.records import ColumnsFabric, FromJsonFabric, Record, RecordsFabric
+
+# Optional fast json library:
+try:
+    import orjson as json_
+except ImportError:
+    import json as json_
 
 # Optional cython extension:
 try:
@@ -16,6 +34,41 @@ except ImportError:
     from aiochclient.types import json2ch, py2ch, rows2ch
 
 
+# Queries are parsed by regexes after string literals, quoted names and comments
+# are blanked in one scan, sqlparse is only imported and used for the queries
+# left unclosed or not starting with a known statement keyword
+RE_STATEMENT_TYPE = re.compile(
+    r"\s*(SELECT|INSERT|SHOW|DESCRIBE|EXISTS|CREATE|DROP|ALTER)\b", re.IGNORECASE
+)
+RE_FORMAT = re.compile(r"\bFORMAT\s+(\w+)", re.IGNORECASE)
+RE_QUOTES_OR_COMMENTS = re.compile(r"['\"`#]|--|/\*")
+RE_LITERALS_OR_COMMENTS = re.compile(
+    r"'(?:[^'\\]|\\.)*'"
+    r'|"(?:[^"\\]|\\.)*"'
+    r"|`(?:[^`\\]|\\.)*`"
+    r"|--[^\n]*"
+    r"|/\*.*?\*/",
+    re.DOTALL,
+)
+FETCH_STATEMENTS = frozenset({'SELECT', 'SHOW', 'DESCRIBE', 'EXISTS'})
+FORMAT_MATCHERS = (lambda tk: tk.is_keyword and tk.normalized == 'FORMAT',)
+JSON_FORMAT_MATCHERS = (lambda tk: tk.match(None, ['JSONEachRow']),)
+JSON_FORMAT_SUFFIX = b" FORMAT JSONEachRow"
+TSV_FORMAT_SUFFIX = b" FORMAT TSVWithNamesAndTypes"
+
+# Query params of these types are cached by value: equal values of them are
+# always escaped the same way. Floats (0.0 == -0.0) and aware datetimes
+# (same instant in another timezone) are not, so they are not cached
+CACHED_PARAM_TYPES = frozenset({int, dt.date, UUID})
+# Only short strings are cached, so the cache does not keep large values alive
+MAX_CACHED_PARAM_STR_LENGTH = 128
+
+
+@lru_cache(maxsize=4096, typed=True)
+def _param2str(value: Any) -> str:
+    return py2ch(value).decode('utf-8')
+
+
 class QueryTypes(Enum):
     FETCH = 0
     INSERT = 1
@@ -36,6 +89,8 @@ class ChClient:
     :param aiohttp.ClientSession session:
         aiohttp client session. Please, use one session
         and one ChClient for all connections in your app.
+        Connection pool limits and keep-alive are set on the session,
+        e.g. ``ClientSession(connector=TCPConnector(limit_per_host=64))``.
 
     :param str url:
         Clickhouse server url. Need full path, like "http://localhost:8123/".
@@ -53,6 +108,14 @@ class ChClient:
         Pass True if you want Clickhouse to compress its responses with gzip.
         They will be decompressed automatically. But overall it will be slightly slower.
 
+    :param json:
+        Module with ``dumps`` and ``loads`` functions used for JSONEachRow
+        queries. Defaults to ``orjson`` if it is installed, else to ``json``.
+        Unlike ``json``, ``orjson`` raises ``TypeError`` for ints wider than
+        64 bits (Int128/UInt128/Int256/UInt256 values) and for non-str dict
+        keys, and writes NaN as ``null``. Pass ``json=json`` to insert such
+        records with the standard library.
+
     :param **settings:
         Any settings from https://clickhouse.yandex/docs/en/operations/settings
     """
@@ -130,69 +193,157 @@ class ChClient:
             raise TypeError('Query params must be a Dict[str, Any]')
         prepared_query_params = {}
         for key, value in params.items():
-            prepared_query_params[key] = py2ch(value).decode('utf-8')
+            if type(value) in CACHED_PARAM_TYPES or (
+                type(value) is str and len(value) <= MAX_CACHED_PARAM_STR_LENGTH
+            ):
+                prepared_query_params[key] = _param2str(value)
+            else:
+                prepared_query_params[key] = py2ch(value).decode('utf-8')
         return prepared_query_params
 
-    async def _execute(
+    def _prepare_request(
         self,
         query: str,
         *args,
         json: bool = False,
         query_params: Optional[Dict[str, Any]] = None,
         query_id: str = None,
-        decode: bool = True,
-    ) -> AsyncGenerator[Record, None]:
+        columns: bool = False,
+    ) -> Tuple[Dict[str, Any], Any, bool, bool]:
         query_params = self._prepare_query_params(query_params)
         if query_params:
             query = query.format(**query_params)
         need_fetch, is_json, statement_type = self._parse_squery(query)
+        suffix = b""
 
         if not is_json and json:
-            query += " FORMAT JSONEachRow"
+            suffix = JSON_FORMAT_SUFFIX
             is_json = True
 
+        if is_json and columns:
+            raise ChClientError("Columnar results are not supported for JSON formats")
+
         if not is_json and need_fetch:
-            query += " FORMAT TSVWithNamesAndTypes"
+            suffix = TSV_FORMAT_SUFFIX
 
         if args:
             if statement_type != 'INSERT':
                 raise ChClientError(
                     "It is possible to pass arguments only for INSERT queries"
                 )
-            params = {**self.params, "query": query}
+            params = self.params.copy()
+            params["query"] = query + suffix.decode() if suffix else query
 
             if is_json:
                 data = json2ch(*args, dumps=self._json.dumps)
             else:
                 data = rows2ch(*args)
         else:
-            params = {**self.params}
-            data = query.encode()
+            params = self.params.copy()
+            data = query.encode() + suffix
 
         if query_id is not None:
             params["query_id"] = query_id
 
+        return params, data, need_fetch, is_json
+
+    async def _execute(
+        self,
+        query: str,
+        *args,
+        json: bool = False,
+        query_params: Optional[Dict[str, Any]] = None,
+        query_id: str = None,
+        decode: bool = True,
+        columns: bool = False,
+    ) -> AsyncGenerator[Record, None]:
+        params, data, need_fetch, is_json = self._prepare_request(
+            query,
+            *args,
+            json=json,
+            query_params=query_params,
+            query_id=query_id,
+            columns=columns,
+        )
         if need_fetch:
-            response = self._http_client.post_return_lines(
+            response = self._http_client.post_return_batches(
                 url=self.url, params=params, headers=self.headers, data=data
             )
-            if is_json:
-                rf = FromJsonFabric(loads=self._json.loads)
-                async for line in response:
-                    yield rf.new(line)
-            else:
-                rf = RecordsFabric(
-                    names=await response.__anext__(),
-                    tps=await response.__anext__(),
-                    convert=decode,
-                )
-                async for line in response:
-                    yield rf.new(line)
+            try:
+                if is_json:
+                    rf = FromJsonFabric(loads=self._json.loads)
+                    async for lines in response:
+                        for row in rf.new_batch(lines):
+                            yield row
+                elif columns:
+                    names, tps, lines = await self._read_header(response)
+                    cf = ColumnsFabric(names=names, tps=tps)
+                    async for batch in response:
+                        lines += batch
+                    yield cf.new(lines)
+                else:
+                    names, tps, lines = await self._read_header(response)
+                    rf = RecordsFabric(names=names, tps=tps, convert=decode)
+                    for row in rf.new_batch(lines):
+                        yield row
+                    async for lines in response:
+                        for row in rf.new_batch(lines):
+                            yield row
+            finally:
+                # Response is released as soon as rows are not needed anymore
+                await response.aclose()
         else:
             await self._http_client.post_no_return(
                 url=self.url, params=params, headers=self.headers, data=data
             )
 
+    async def _fetch_all(
+        self,
+        query: str,
+        *args,
+        json: bool = False,
+        query_params: Optional[Dict[str, Any]] = None,
+        query_id: str = None,
+        decode: bool = True,
+    ) -> List[Record]:
+        # Same as consuming _execute, but records are built
+        # from whole response batches without an intermediate async generator
+        params, data, need_fetch, is_json = self._prepare_request(
+            query, *args, json=json, query_params=query_params, query_id=query_id
+        )
+        if not need_fetch:
+            await self._http_client.post_no_return(
+                url=self.url, params=params, headers=self.headers, data=data
+            )
+            return []
+        response = self._http_client.post_return_batches(
+            url=self.url, params=params, headers=self.headers, data=data
+        )
+        try:
+            if is_json:
+                rf = FromJsonFabric(loads=self._json.loads)
+                lines = []
+            else:
+                names, tps, lines = await self._read_header(response)
+                rf = RecordsFabric(names=names, tps=tps, convert=decode)
+            async for batch in response:
+                lines += batch
+        finally:
+            # Response is released right away, also when reading it fails
+            await response.aclose()
+        return rf.new_batch(lines)
+
+    @staticmethod
+    async def _read_header(
+        response: AsyncGenerator[List[bytes], None],
+    ) -> Tuple[bytes, bytes, List[bytes]]:
+        # Names and types lines of TSVWithNamesAndTypes
+        # and the rest of the batches they came with
+        lines = await response.__anext__()
+        while len(lines) < 2:
+            lines += await response.__anext__()
+        return lines[0], lines[1], lines[2:]
+
     async def execute(
         self,
         query: str,
@@ -231,10 +382,14 @@ class ChClient:
 
         :return: Nothing.
         """
-        async for _ in self._execute(
+        # Plain coroutine path: no records are built and no async
+        # generator is created, results of fetch queries are not read
+        params, data, _, _ = self._prepare_request(
             query, *args, json=json, query_params=params, query_id=query_id
-        ):
-            return None
+        )
+        await self._http_client.post_no_return(
+            url=self.url, params=params, headers=self.headers, data=data
+        )
 
     async def fetch(
         self,
@@ -262,17 +417,48 @@ class ChClient:
 
         :return: All rows from query.
         """
-        return [
-            row
-            async for row in self._execute(
-                query,
-                *args,
-                json=json,
-                query_params=params,
-                query_id=query_id,
-                decode=decode,
-            )
-        ]
+        return await self._fetch_all(
+            query,
+            *args,
+            json=json,
+            query_params=params,
+            query_id=query_id,
+            decode=decode,
+        )
+
+    async def fetch_columns(
+        self,
+        query: str,
+        *args,
+        params: Optional[Dict[str, Any]] = None,
+        query_id: str = None,
+    ) -> Dict[str, Any]:
+        """Execute query and fetch all rows from query result at once
+        as numpy arrays, one per column. Requires ``numpy``.
+
+        :param query: Clickhouse query string.
+        :param Optional[Dict[str, Any]] params: Params to escape inside query string.
+        :param str query_id: Clickhouse query_id.
+
+        Usage:
+
+        .. code-block:: python
+
+            columns = await client.fetch_columns("SELECT a, b FROM t")
+            assert columns["a"].dtype == numpy.uint8
+
+        :return: Dict of column names to numpy arrays. Numeric columns
+                 have native dtypes, others are arrays of python objects.
+        """
+        async for result in self._execute(
+            query,
+            *args,
+            query_params=params,
+            query_id=query_id,
+            columns=True,
+        ):
+            return result
+        return {}
 
     async def fetchrow(
         self,
@@ -302,16 +488,21 @@ class ChClient:
 
         :return: First row from query or None if there no results.
         """
-        async for row in self._execute(
+        rows = self._execute(
             query,
             *args,
             json=json,
             query_params=params,
             query_id=query_id,
             decode=decode,
-        ):
-            return row
-        return None
+        )
+        try:
+            return await rows.__anext__()
+        except StopAsyncIteration:
+            return None
+        finally:
+            # Response is released right away instead of on garbage collection
+            await rows.aclose()
 
     async def fetchone(self, query: str, *args) -> Optional[Record]:
         """Deprecated. Use ``fetchrow`` method instead"""
@@ -349,19 +540,23 @@ class ChClient:
 
         :return: First value of the first row or None if there no results.
         """
-        async for row in self._execute(
+        rows = self._execute(
             query,
             *args,
             json=json,
             query_params=params,
             query_id=query_id,
             decode=decode,
-        ):
-            if row:
-                return row[0]
-        return None
+        )
+        try:
+            async for row in rows:
+                if row:
+                    return row[0]
+            return None
+        finally:
+            await rows.aclose()
 
-    async def iterate(
+    def iterate(
         self,
         query: str,
         *args,
@@ -396,15 +591,16 @@ class ChClient:
 
         :return: Rows one by one.
         """
-        async for row in self._execute(
+        # The generator of _execute is returned as is, so every row
+        # is not passed through one more async generator
+        return self._execute(
             query,
             *args,
             json=json,
             query_params=params,
             query_id=query_id,
             decode=decode,
-        ):
-            yield row
+        )
 
     async def cursor(self, query: str, *args) -> AsyncGenerator[Record, None]:
         """Deprecated. Use ``iterate`` method instead"""
@@ -418,13 +614,15 @@ class ChClient:
     async def insert_file(
         self,
         query: str,
-        file_obj: BinaryIO,
+        file_obj: Union[BinaryIO, bytes],
         params: Optional[Dict[str, Any]] = None,
     ) -> None:
         """Insert file in any suppoted by ClickHouse format. Returns None.
 
         :param str query: Clickhouse query string which include format part.
-        :param bool file_obj: File object to insert.
+        :param Union[BinaryIO, bytes] file_obj: File object or bytes to insert.
+            File objects are streamed in chunks, so the whole file is never
+            held in memory.
         :param Optional[Dict[str, Any]] params: Params to escape inside query string.
 
         Usage:
@@ -433,7 +631,7 @@ class ChClient:
             with open('data.csv', 'rb') as f: 
                 await client.insert_file(
                     "INSERT INTO t FORMAT CSV",
-                    f.read(),
+                    f,
                 )
 
             with open('data.json', 'rb') as f:
@@ -456,7 +654,8 @@ class ChClient:
         if query_params:
             query = query.format(**query_params)
 
-        params = {**self.params, "query": query}
+        params = self.params.copy()
+        params["query"] = query
 
         await self._http_client.post_no_return(
             url=self.url,
@@ -467,20 +666,25 @@ class ChClient:
 
     @staticmethod
     def _parse_squery(query):
+        stripped = query
+        if RE_QUOTES_OR_COMMENTS.search(stripped):
+            stripped = RE_LITERALS_OR_COMMENTS.sub(" ", stripped)
+        match = RE_STATEMENT_TYPE.match(stripped)
+        if match and not RE_QUOTES_OR_COMMENTS.search(stripped):
+            statement_type = match.group(1).upper()
+            fmt = RE_FORMAT.search(stripped)
+            is_json = fmt is not None and fmt.group(1) == 'JSONEachRow'
+            return statement_type in FETCH_STATEMENTS, is_json, statement_type
+        from aiochclient.sql import sqlparse
+
         statement = sqlparse.parse(query)[0]
         statement_type = statement.get_type()
-        if statement_type in ('SELECT', 'SHOW', 'DESCRIBE', 'EXISTS'):
-            need_fetch = True
-        else:
-            need_fetch = False
+        need_fetch = statement_type in FETCH_STATEMENTS
 
-        fmt = statement.token_matching(
-            (lambda tk: tk.match(sqlparse.tokens.Keyword, 'FORMAT'),), 0
-        )
+        fmt = statement.token_matching(FORMAT_MATCHERS, 0)
         if fmt:
             is_json = statement.token_matching(
-                (lambda tk: tk.match(None, ['JSONEachRow']),),
-                statement.token_index(fmt) + 1,
+                JSON_FORMAT_MATCHERS, statement.token_index(fmt) + 1
             )
         else:
             is_json = False
@@ -488,13 +692,13 @@ class ChClient:
 
     @staticmethod
     def _check_insert_file_query(query: str) -> None:
+        from aiochclient.sql import sqlparse
+
         statement = sqlparse.parse(query)[0]
         if statement.get_type() != 'INSERT':
             raise ChClientError('It is possible to insert file only with INSERT query')
 
-        if not statement.token_matching(
-            (lambda tk: tk.match(sqlparse.tokens.Keyword, 'FORMAT'),), 0
-        ):
+        if not statement.token_matching(FORMAT_MATCHERS, 0):
             raise ChClientError(
                 'To insert file its required to specify `FORMAT [...] in the query.'
             )
@@ -1,19 +1,35 @@
 from abc import ABC, abstractmethod
-from typing import Any, AsyncGenerator
+from functools import lru_cache
+from typing import Any, AsyncGenerator, List
 
 from aiochclient.exceptions import ChClientError
 
 
 class HttpClientABC(ABC):
+    line_separator: bytes = b'\n'
+
     @abstractmethod
     async def get(self, url: str, params: dict, headers: dict) -> None:
         """Use aiochclient.exceptions.ChClientError in case of bad status code"""
 
-    @abstractmethod
     async def post_return_lines(
         self, url: str, params: dict, headers: dict, data: Any
     ) -> AsyncGenerator[bytes, None]:
-        """Use aiochclient.exceptions.ChClientError in case of bad status code"""
+        """Yield response lines one by one with their line separators,
+        built on top of ``post_return_batches``"""
+        async for lines in self.post_return_batches(
+            url=url, params=params, headers=headers, data=data
+        ):
+            for line in lines:
+                yield line + self.line_separator
+
+    @abstractmethod
+    async def post_return_batches(
+        self, url: str, params: dict, headers: dict, data: Any
+    ) -> AsyncGenerator[List[bytes], None]:
+        """Yield lists of response lines without line separators,
+        as many as every received chunk contains.
+        Use aiochclient.exceptions.ChClientError in case of bad status code"""
 
     @abstractmethod
     async def post_no_return(
@@ -27,22 +43,30 @@ class HttpClientABC(ABC):
 
     @staticmethod
     def choose_http_client(session):
-        try:
-            import aiohttp
+        return _choose_http_client(type(session))
+
+
+@lru_cache(maxsize=8)
+def _choose_http_client(session_type: type):
+    # Cached per session type: the checks below import http libraries,
+    # and failed imports are not cached by python itself
+    no_session = session_type is type(None)
+    try:
+        import aiohttp
 
-            if session is None or isinstance(session, aiohttp.ClientSession):
-                from aiochclient.http_clients.aiohttp import AiohttpHttpClient
+        if no_session or issubclass(session_type, aiohttp.ClientSession):
+            from aiochclient.http_clients.aiohttp import AiohttpHttpClient
 
-                return AiohttpHttpClient
-        except ImportError:
-            pass
-        try:
-            import httpx
+            return AiohttpHttpClient
+    except ImportError:
+        pass
+    try:
+        import httpx
 
-            if session is None or isinstance(session, httpx.AsyncClient):
-                from aiochclient.http_clients.httpx import HttpxHttpClient
+        if no_session or issubclass(session_type, httpx.AsyncClient):
+            from aiochclient.http_clients.httpx import HttpxHttpClient
 
-                return HttpxHttpClient
-        except ImportError:
-            pass
-        raise ChClientError('Async http client heeded. Please install aiohttp or httpx')
+            return HttpxHttpClient
+    except ImportError:
+        pass
+    raise ChClientError('Async http client heeded. Please install aiohttp or httpx')
@@ -7,34 +7,38 @@ from aiochclient.http_clients.abc import HttpClientABC
 
 
 class AiohttpHttpClient(HttpClientABC):
-    line_separator: bytes = b'\n'
+    # Bigger read buffer for sessions created by the client itself,
+    # so large results are read with fewer event loop wakeups
+    read_bufsize: int = 1 << 20
 
     def __init__(self, session: Optional[ClientSession]):
         if session:
             self._session = session
         else:
-            self._session = ClientSession()
+            self._session = ClientSession(read_bufsize=self.read_bufsize)
 
     async def get(self, url: str, params: dict, headers: dict) -> None:
         async with self._session.get(url=url, params=params, headers=headers) as resp:
-            await _check_response(resp)
+            if resp.status != 200:
+                raise ChClientError(await _read_error_body(resp))
 
-    async def post_return_lines(
+    async def post_return_batches(
         self, url: str, params: dict, headers: dict, data: Any
-    ) -> AsyncGenerator[bytes, None]:
+    ) -> AsyncGenerator[List[bytes], None]:
         async with self._session.post(
             url=url, params=params, headers=headers, data=data
         ) as resp:
-            await _check_response(resp)
+            if resp.status != 200:
+                raise ChClientError(await _read_error_body(resp))
 
             buffer: bytes = b''
             async for chunk in resp.content.iter_any():
                 lines: List[bytes] = chunk.split(self.line_separator)
                 if buffer:
                     lines[0] = buffer + lines[0]
-                for line in lines[:-1]:
-                    yield line + self.line_separator
-                buffer = lines[-1]
+                buffer = lines.pop()
+                if lines:
+                    yield lines
             assert not buffer
 
     async def post_no_return(
@@ -43,16 +47,12 @@ class AiohttpHttpClient(HttpClientABC):
         async with self._session.post(
             url=url, params=params, headers=headers, data=data
         ) as resp:
-            await _check_response(resp)
+            if resp.status != 200:
+                raise ChClientError(await _read_error_body(resp))
 
     async def close(self) -> None:
         await self._session.close()
 
 
-async def _check_response(resp):
-    if resp.status != 200:
-        raise ChClientError(await _read_error_body(resp))
-
-
 async def _read_error_body(resp):
     return (await resp.read()).decode(errors='replace')
@@ -1,57 +1,74 @@
+import asyncio
 from typing import Any, AsyncGenerator, List, Optional
 
-from httpx import AsyncClient, Response
+from httpx import AsyncClient, Limits, Response
 
 from aiochclient.exceptions import ChClientError
 from aiochclient.http_clients.abc import HttpClientABC
 
 
 class HttpxHttpClient(HttpClientABC):
-    line_separator: bytes = b'\n'
+    # Pool for sessions created by the client itself: more connections
+    # are kept alive for parallel queries than with httpx defaults
+    limits: Limits = Limits(max_connections=100, max_keepalive_connections=50)
+    # File objects are sent in chunks of this size instead of being read at once
+    file_chunk_size: int = 1 << 20
 
     def __init__(self, session: Optional[AsyncClient]):
         if session:
             self._session = session
         else:
-            self._session = AsyncClient()
+            self._session = AsyncClient(limits=self.limits)
 
     async def get(self, url: str, params: dict, headers: dict) -> None:
         resp = await self._session.get(url=url, params=params, headers=headers)
-        await _check_response(resp)
+        if resp.status_code != 200:
+            raise ChClientError(await _read_error_body(resp))
 
-    async def post_return_lines(
+    async def post_return_batches(
         self, url: str, params: dict, headers: dict, data: Any
-    ) -> AsyncGenerator[bytes, None]:
-        resp = await self._session.post(
-            url=url, params=params, headers=headers, content=data
-        )
-        await _check_response(resp)
-
-        buffer: bytes = b''
-        async for chunk in resp.aiter_bytes():
-            lines: List[bytes] = chunk.split(self.line_separator)
-            if buffer:
-                lines[0] = buffer + lines[0]
-            for line in lines[:-1]:
-                yield line + self.line_separator
-            buffer = lines[-1]
-        assert not buffer
+    ) -> AsyncGenerator[List[bytes], None]:
+        # Streamed, so rows are handled while the rest is still being received
+        async with self._session.stream(
+            "POST", url=url, params=params, headers=headers, content=data
+        ) as resp:
+            if resp.status_code != 200:
+                raise ChClientError(await _read_error_body(resp))
+
+            buffer: bytes = b''
+            async for chunk in resp.aiter_bytes():
+                lines: List[bytes] = chunk.split(self.line_separator)
+                if buffer:
+                    lines[0] = buffer + lines[0]
+                buffer = lines.pop()
+                if lines:
+                    yield lines
+            assert not buffer
 
     async def post_no_return(
         self, url: str, params: dict, headers: dict, data: Any
     ) -> None:
+        if hasattr(data, "read"):
+            data = _iter_file(data, self.file_chunk_size)
         resp = await self._session.post(
             url=url, params=params, headers=headers, content=data
         )
-        await _check_response(resp)
+        if resp.status_code != 200:
+            raise ChClientError(await _read_error_body(resp))
 
     async def close(self) -> None:
         await self._session.aclose()
 
 
-async def _check_response(resp):
-    if resp.status_code != 200:
-        raise ChClientError(await _read_error_body(resp))
+async def _iter_file(file_obj: Any, chunk_size: int) -> AsyncGenerator[bytes, None]:
+    # httpx only streams async iterables from an AsyncClient,
+    # blocking reads are run in the default executor
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, file_obj.read, chunk_size)
+        if not chunk:
+            return
+        yield chunk.encode() if isinstance(chunk, str) else chunk
 
 
 async def _read_error_body(resp: Response):
@@ -1,13 +1,38 @@
 from collections.abc import Mapping
-from typing import Any, Callable, Dict, Iterator, List, Tuple, Union
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from aiochclient.exceptions import ChClientError
 
 # Optional cython extension:
 try:
-    from aiochclient._types import empty_convertor, what_py_converter
+    from aiochclient._types import cached_converter, decode_row, what_py_converter
+except ImportError:
+    from aiochclient.types import cached_converter, decode_row, what_py_converter
+
+# Optional numpy for columnar results:
+try:
+    import numpy as np
 except ImportError:
-    from aiochclient.types import empty_convertor, what_py_converter
+    np = None
 
-__all__ = ["RecordsFabric", "Record", "FromJsonFabric"]
+__all__ = ["RecordsFabric", "Record", "FromJsonFabric", "ColumnsFabric"]
+
+# Columns of these types are parsed by numpy without python objects
+NUMPY_DTYPES = {
+    "UInt8": "uint8",
+    "UInt16": "uint16",
+    "UInt32": "uint32",
+    "UInt64": "uint64",
+    "Int8": "int8",
+    "Int16": "int16",
+    "Int32": "int32",
+    "Int64": "int64",
+    "Float32": "float32",
+    "Float64": "float64",
+}
+
+_MISSING = object()
 
 
 class Record(Mapping):
@@ -28,21 +53,33 @@ class Record(Mapping):
 
     """
 
-    __slots__ = ("_converters", "_decoded", "_names", "_row")
+    __slots__ = ("_cache", "_converters", "_fields", "_missing", "_names", "_row")
 
-    def __init__(self, row: bytes, names: Dict[str, Any], converters: List[Callable]):
+    def __init__(
+        self,
+        row: bytes,
+        names: Dict[str, Any],
+        converters: Optional[List[Callable]],
+    ):
         self._row: Union[bytes, Tuple[Any]] = row
+        self._fields: Optional[List[bytes]] = None
+        self._cache: Optional[List[Any]] = None
         if not self._row:
             # in case of empty row
-            self._decoded = True
+            self._row = ()
             self._converters = []
             self._names = {}
         else:
-            self._decoded = False
             self._converters = converters
             self._names = names
 
     def __getitem__(self, key: Union[str, int, slice]) -> Any:
+        if (
+            type(self._row) == bytes
+            and type(key) != slice
+            and self._converters is not None
+        ):
+            return self._getfield(key)
         self._decode()
         return self._getitem(key)
 
@@ -65,6 +102,33 @@ class Record(Mapping):
                 )
             raise IndexError(f"No fields with index '{key}'")
 
+    def _getfield(self, key: Union[str, int]) -> Any:
+        """Decodes only one field, the rest of the row stays raw
+        until more than half of the fields are decoded"""
+        if self._fields is None:
+            self._fields = self._row.split(b"\t")
+            self._cache = [_MISSING] * len(self._fields)
+            self._missing = len(self._fields)
+        if type(key) == str:
+            try:
+                index = self._names[key]
+            except KeyError:
+                raise KeyError(f"No fields with name '{key}'")
+        else:
+            index = key
+        try:
+            value = self._cache[index]
+        except IndexError:
+            raise IndexError(f"No fields with index '{key}'")
+        if value is _MISSING:
+            value = self._cache[index] = self._converters[index](self._fields[index])
+            self._missing -= 1
+            if self._missing * 2 < len(self._cache):
+                # Most fields are used anyway, so the row is decoded once
+                # instead of keeping both split fields and values around
+                self._decode()
+        return value
+
     def __iter__(self) -> Iterator:
         return iter(self._names)
 
@@ -72,29 +136,62 @@ class Record(Mapping):
         return len(self._names)
 
     def _decode(self):
-        if self._decoded:
+        if type(self._row) != bytes:
             return None
-        self._row = tuple(
-            converter(val)
-            for converter, val in zip(self._converters, self._row.split(b"\t"))
+        if self._converters is None:
+            # Not decoded records only need their fields to be split
+            self._row = tuple(self._row.split(b"\t"))
+        elif self._fields is None:
+            self._row = decode_row(self._converters, self._row)
+        else:
+            self._row = tuple(
+                [
+                    converter(field) if value is _MISSING else value
+                    for converter, field, value in zip(
+                        self._converters, self._fields, self._cache
+                    )
+                ]
+            )
+            self._fields = self._cache = None
+
+
+def _is_low_cardinality(tp: str) -> bool:
+    return tp.strip().startswith("LowCardinality(")
+
+
+@lru_cache(maxsize=256)
+def _parse_header(
+    tps: bytes, names: bytes, convert: bool
+) -> Tuple[Dict[str, int], Optional[List[Callable]], Tuple[int, ...]]:
+    # Repeated queries get the same header lines, so their names
+    # and converters are parsed once and shared by all results.
+    # No converters at all means fields are returned as bytes
+    names = names.decode().strip().split("\t")
+    names = {key: index for (index, key) in enumerate(names)}
+    if convert:
+        tps = tps.decode().strip().split("\t")
+        converters = [what_py_converter(tp) for tp in tps]
+        low_cardinality = tuple(
+            index for index, tp in enumerate(tps) if _is_low_cardinality(tp)
         )
-        self._decoded = True
+    else:
+        converters = None
+        low_cardinality = ()
+    return names, converters, low_cardinality
 
 
 class RecordsFabric:
     __slots__ = ("converters", "names")
 
     def __init__(self, tps: bytes, names: bytes, convert: bool = True):
-        names = names.decode().strip().split("\t")
-        self.names = {key: index for (index, key) in enumerate(names)}
-        if convert:
-            self.converters = [
-                what_py_converter(tp) for tp in tps.decode().strip().split("\t")
-            ]
-        else:
-            self.converters = [
-                empty_convertor for _ in tps.decode().strip().split("\t")
-            ]
+        self.names, self.converters, low_cardinality = _parse_header(
+            tps, names, convert
+        )
+        if low_cardinality:
+            # LowCardinality values are shared by rows of this query only
+            self.converters = self.converters.copy()
+            for index in low_cardinality:
+                self.converters[index] = cached_converter(self.converters[index])
 
     def new(self, row: bytes) -> Record:
         return Record(
@@ -103,6 +200,11 @@ class RecordsFabric:
             converters=self.converters,
         )
 
+    def new_batch(self, rows: List[bytes]) -> List[Record]:
+        """Rows come without delimiters, as yielded by ``post_return_batches``"""
+        names, converters = self.names, self.converters
+        return [Record(row, names, converters) for row in rows]
+
 
 class FromJsonFabric:
     def __init__(self, loads):
@@ -110,3 +212,39 @@ class FromJsonFabric:
 
     def new(self, row: bytes) -> Any:
         return self.loads(row)
+
+    def new_batch(self, rows: List[bytes]) -> List[Any]:
+        return list(map(self.loads, rows))
+
+
+class ColumnsFabric:
+    """Builds ``{name: numpy.ndarray}`` from all rows of a result.
+    Numeric columns get native dtypes, other columns are
+    converted as usual and stored in arrays of objects.
+    """
+
+    __slots__ = ("names", "tps")
+
+    def __init__(self, tps: bytes, names: bytes):
+        if np is None:
+            raise ChClientError("numpy is required for columnar results")
+        self.names = names.decode().strip().split("\t")
+        self.tps = [tp.strip() for tp in tps.decode().strip().split("\t")]
+
+    def new(self, rows: List[bytes]) -> Dict[str, Any]:
+        columns = list(zip(*[row.split(b"\t") for row in rows]))
+        if not columns:
+            columns = [()] * len(self.names)
+        result = {}
+        for name, tp, column in zip(self.names, self.tps, columns):
+            dtype = NUMPY_DTYPES.get(tp)
+            if dtype is not None:
+                result[name] = np.array(column, dtype=bytes).astype(dtype)
+            else:
+                converter = what_py_converter(tp)
+                if _is_low_cardinality(tp):
+                    converter = cached_converter(converter)
+                result[name] = np.fromiter(
+                    map(converter, column), dtype=object, count=len(column)
+                )
+        return result
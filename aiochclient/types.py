@@ -1,9 +1,11 @@
 import datetime as dt
 import re
+import sys
 from abc import ABC, abstractmethod
 from decimal import Decimal
+from functools import lru_cache
 from ipaddress import IPv4Address, IPv6Address
-from typing import Any, Callable, Generator, List, Optional
+from typing import Any, Callable, List, Optional
 from uuid import UUID
 
 from aiochclient.exceptions import ChClientError
@@ -13,18 +15,51 @@ try:
 
     date_parse = datetime_parse = datetime_parse_f = ciso8601.parse_datetime
 except ImportError:
+    # Clickhouse always sends dates in fixed width format,
+    # so fromisoformat or slicing is much faster than strptime here
+    if sys.version_info >= (3, 7):
+        date_parse = datetime_parse = dt.datetime.fromisoformat
+    else:
+
+        def date_parse(string):
+            return dt.datetime(int(string[0:4]), int(string[5:7]), int(string[8:10]))
+
+        def datetime_parse(string):
+            return dt.datetime(
+                int(string[0:4]),
+                int(string[5:7]),
+                int(string[8:10]),
+                int(string[11:13]),
+                int(string[14:16]),
+                int(string[17:19]),
+            )
 
-    def date_parse(string):
-        return dt.datetime.strptime(string, '%Y-%m-%d')
-
-    def datetime_parse(string):
-        return dt.datetime.strptime(string, '%Y-%m-%d %H:%M:%S')
-
-    def datetime_parse_f(string):
-        return dt.datetime.strptime(string, '%Y-%m-%d %H:%M:%S.%f')
+    # Fractions of any length are parsed by fromisoformat since 3.11
+    if sys.version_info >= (3, 11):
+        datetime_parse_f = dt.datetime.fromisoformat
+    else:
+
+        def datetime_parse_f(string):
+            return dt.datetime(
+                int(string[0:4]),
+                int(string[5:7]),
+                int(string[8:10]),
+                int(string[11:13]),
+                int(string[14:16]),
+                int(string[17:19]),
+                int(string[20:26].ljust(6, "0")),
+            )
 
 
-__all__ = ["what_py_converter", "rows2ch", "json2ch", "py2ch", "empty_convertor"]
+__all__ = [
+    "what_py_converter",
+    "cached_converter",
+    "decode_row",
+    "rows2ch",
+    "json2ch",
+    "py2ch",
+    "empty_convertor",
+]
 
 
 RE_TUPLE = re.compile(r"^Tuple\((.*)\)$")
@@ -33,7 +68,11 @@ RE_NESTED = re.compile(r"^Nested\((.*)\)$")
 RE_NULLABLE = re.compile(r"^Nullable\((.*)\)$")
 RE_LOW_CARDINALITY = re.compile(r"^LowCardinality\((.*)\)$")
 RE_MAP = re.compile(r"^Map\((.*)\)$")
-RE_REPLACE_QUOTE = re.compile(r"(?<!\\)'")
+RE_AGGREGATE = re.compile(r",(.*)\)")
+
+# Max number of distinct values remembered by a cached converter,
+# values seen after that are converted every time
+LOW_CARDINALITY_CACHE_SIZE = 10_000
 
 
 def remove_single_quotes(string: str) -> str:
@@ -56,6 +95,7 @@ class BaseType(ABC):
         b"'": b"'",
         b"\\": b"\\",
     }
+    ESC_CHR_RE = re.compile(rb"\\(.)", re.DOTALL)
 
     DQ = "'"
     CM = ","
@@ -64,6 +104,7 @@ class BaseType(ABC):
     TUP_CLS = ')'
     ARR_OP = '['
     ARR_CLS = ']'
+    SEQ_OPS = frozenset((DQ, TUP_OP, TUP_CLS, ARR_OP, ARR_CLS))
 
     def __init__(self, name: str, container: bool = False):
         self.name = name
@@ -80,62 +121,53 @@ class BaseType(ABC):
         backslash-escaped special characters
         to pythonic string format
         """
-        n = val.find(b"\\")
-        if n < 0:
+        if b"\\" not in val:
             return val.decode()
-        n += 1
-        d = val[:n]
-        b = val[n:]
-        while b:
-            d = d[:-1] + cls.ESC_CHR_MAPPING.get(b[0:1], b[0:1])
-            b = b[1:]
-            n = b.find(b"\\")
-            if n < 0:
-                d = d + b
-                break
-            n += 1
-            d = d + b[:n]
-            b = b[n:]
-        return d.decode()
+        return cls.ESC_CHR_RE.sub(cls._unescape, val).decode()
+
+    @classmethod
+    def _unescape(cls, match) -> bytes:
+        char = match.group(1)
+        return cls.ESC_CHR_MAPPING.get(char, char)
 
     @classmethod
-    def seq_parser(cls, raw: str) -> Generator[str, None, None]:
+    def seq_parser(cls, raw: str) -> List[str]:
         """
-        Generator for parsing tuples and arrays.
-        Returns elements one by one
+        Parser for tuples and arrays.
+        Returns list of elements
         """
         if not raw:
-            return None
-        cur = []
+            return []
+        dq, cm, escape_op = cls.DQ, cls.CM, cls.ESCAPE_OP
+        if dq not in raw and cls.ARR_OP not in raw and cls.TUP_OP not in raw:
+            # Flat sequence of numbers, nothing can hide a comma
+            return raw.split(cm)
+        res = []
+        start = 0
+        depth = 0
         in_str = False
-        in_arr = False
-        in_tup = False
         escape_char = False
-        for sym in raw:
-            if not (in_str or in_arr or in_tup):
-                if sym == cls.CM:
-                    yield "".join(cur)
-                    cur.clear()
-                    continue
-                elif sym == cls.DQ:
-                    in_str = not in_str
-                elif sym == cls.ARR_OP:
-                    in_arr = True
-                elif sym == cls.TUP_OP:
-                    in_tup = True
-            elif in_str and sym == cls.DQ:
-                if not escape_char:
-                    in_str = not in_str
-            elif in_arr and sym == cls.ARR_CLS:
-                in_arr = False
-            elif in_tup and sym == cls.TUP_CLS:
-                in_tup = False
-            if in_str and sym == cls.ESCAPE_OP:
-                escape_char = not escape_char
-            else:
-                escape_char = False
-            cur.append(sym)
-        yield "".join(cur)
+        for i, sym in enumerate(raw):
+            if in_str:
+                if escape_char:
+                    escape_char = False
+                elif sym == escape_op:
+                    escape_char = True
+                elif sym == dq:
+                    in_str = False
+            elif sym == cm:
+                if not depth:
+                    res.append(raw[start:i])
+                    start = i + 1
+            elif sym in cls.SEQ_OPS:
+                if sym == dq:
+                    in_str = True
+                elif sym == cls.ARR_OP or sym == cls.TUP_OP:
+                    depth += 1
+                else:
+                    depth -= 1
+        res.append(raw[start:])
+        return res
 
     def convert(self, value: bytes) -> Any:
         return self.p_type(self.decode(value))
@@ -152,9 +184,14 @@ class StrType(BaseType):
             return remove_single_quotes(string)
         return string
 
+    def convert(self, value: bytes) -> str:
+        return self.decode(value)
+
     @staticmethod
     def unconvert(value: str) -> bytes:
-        value = value.replace("\\", "\\\\").replace("'", "\\'")
+        # Most strings have nothing to escape
+        if "\\" in value or "'" in value:
+            value = value.replace("\\", "\\\\").replace("'", "\\'")
         return f"'{value}'".encode()
 
 
@@ -179,17 +216,28 @@ class BoolType(BaseType):
 
 class IntType(BaseType):
     p_type = int
-
-    def convert(self, value: bytes) -> Any:
-        return self.p_type(value)
+    # int parses bytes itself, so converters get the builtin
+    # with no python-level method call per value
+    convert = int
 
     @staticmethod
     def unconvert(value: int) -> bytes:
         return b"%d" % value
 
 
+class SmallIntType(IntType):
+    # All Int8 and UInt8 values, lookup is faster than parsing
+    VALUES = {b"%d" % i: i for i in range(-128, 256)}
+
+    def convert(self, value: bytes) -> int:
+        result = self.VALUES.get(value)
+        if result is None:
+            return int(value)
+        return result
+
+
 class FloatType(IntType):
-    p_type = float
+    p_type = convert = float
 
     @staticmethod
     def unconvert(value: float) -> bytes:
@@ -198,7 +246,8 @@ class FloatType(IntType):
 
 class DateType(BaseType):
     def p_type(self, string: str):
-        string = string.strip("'")
+        if self.container:
+            string = string[1:-1]
         try:
             return date_parse(string).date()
         except ValueError:
@@ -212,12 +261,13 @@ class DateType(BaseType):
 
     @staticmethod
     def unconvert(value: dt.date) -> bytes:
-        return b"%a" % str(value)
+        return f"'{value.isoformat()}'".encode()
 
 
 class DateTimeType(BaseType):
     def p_type(self, string: str):
-        string = string.strip("'")
+        if self.container:
+            string = string[1:-1]
         try:
             return datetime_parse(string)
         except ValueError:
@@ -231,6 +281,9 @@ class DateTimeType(BaseType):
 
     @staticmethod
     def unconvert(value: dt.datetime) -> bytes:
+        if value.tzinfo is None:
+            # Same format as below, with microseconds only if there are any
+            return f"'{value.isoformat(' ')}'".encode()
         if value.microsecond != 0:
             # In case of 0000-00-00 00:00:00.000 (datetime64)
             return b"%a" % dt.datetime.strftime(value, '%Y-%m-%d %H:%M:%S.%f')
@@ -239,7 +292,8 @@ class DateTimeType(BaseType):
 
 class DateTime64Type(BaseType):
     def p_type(self, string: str):
-        string = string.strip("'")
+        if self.container:
+            string = string[1:-1]
         try:
             return datetime_parse_f(string)
         except ValueError:
@@ -254,38 +308,44 @@ class DateTime64Type(BaseType):
 
 class UUIDType(BaseType):
     def p_type(self, string):
-        return UUID(string.strip("'"))
+        if self.container:
+            string = string[1:-1]
+        return UUID(string)
 
     def convert(self, value: bytes) -> UUID:
         return self.p_type(value.decode())
 
     @staticmethod
     def unconvert(value: UUID) -> bytes:
-        return b"%a" % str(value)
+        return f"'{value}'".encode()
 
 
 class IPv4Type(BaseType):
     def p_type(self, string):
-        return IPv4Address(string.strip("'"))
+        if self.container:
+            string = string[1:-1]
+        return IPv4Address(string)
 
     def convert(self, value: bytes) -> IPv4Address:
         return self.p_type(value.decode())
 
     @staticmethod
-    def unconvert(value: UUID) -> bytes:
-        return b"%a" % str(value)
+    def unconvert(value: IPv4Address) -> bytes:
+        return f"'{value}'".encode()
 
 
 class IPv6Type(BaseType):
     def p_type(self, string):
-        return IPv6Address(string.strip("'"))
+        if self.container:
+            string = string[1:-1]
+        return IPv6Address(string)
 
     def convert(self, value: bytes) -> IPv6Address:
         return self.p_type(value.decode())
 
     @staticmethod
-    def unconvert(value: UUID) -> bytes:
-        return b"%a" % str(value)
+    def unconvert(value: IPv6Address) -> bytes:
+        return f"'{value}'".encode()
 
 
 class TupleType(BaseType):
@@ -293,7 +353,7 @@ class TupleType(BaseType):
 
     def __init__(self, name: str, **kwargs):
         super().__init__(name, **kwargs)
-        tps = RE_TUPLE.findall(name)[0]
+        tps = RE_TUPLE.match(name).group(1)
         self.types = tuple(
             what_py_type(tp.rpartition(" ")[2], container=True) for tp in tps.split(",")
         )
@@ -301,7 +361,7 @@ class TupleType(BaseType):
     def p_type(self, string: str) -> tuple:
         return tuple(
             tp.p_type(val)
-            for tp, val in zip(self.types, self.seq_parser(string.strip("()")))
+            for tp, val in zip(self.types, self.seq_parser(string[1:-1]))
         )
 
     def convert(self, value: bytes) -> list:
@@ -309,7 +369,7 @@ class TupleType(BaseType):
 
     @staticmethod
     def unconvert(value) -> bytes:
-        return b"(" + b",".join(py2ch(elem) for elem in value) + b")"
+        return b"(%b)" % b",".join(map(py2ch, value))
 
 
 class MapType(BaseType):
@@ -317,7 +377,7 @@ class MapType(BaseType):
 
     def __init__(self, name: str, **kwargs):
         super().__init__(name, **kwargs)
-        tps = RE_MAP.findall(name)[0]
+        tps = RE_MAP.match(name).group(1)
         comma_index = tps.index(",")
         self.key_type = what_py_type(tps[:comma_index], container=True)
         self.value_type = what_py_type(tps[comma_index + 1 :], container=True)
@@ -346,20 +406,17 @@ class ArrayType(BaseType):
 
     def __init__(self, name: str, **kwargs):
         super().__init__(name, **kwargs)
-        self.type = what_py_type(RE_ARRAY.findall(name)[0], container=True)
+        self.type = what_py_type(RE_ARRAY.match(name).group(1), container=True)
 
     def p_type(self, string: str) -> list:
-        return [
-            self.type.p_type(val)
-            for val in self.seq_parser(string[1:-1])
-        ]
+        return list(map(self.type.p_type, self.seq_parser(string[1:-1])))
 
     def convert(self, value: bytes) -> list:
         return self.p_type(value.decode())
 
     @staticmethod
     def unconvert(value) -> bytes:
-        return b"[" + b",".join(py2ch(elem) for elem in value) + b"]"
+        return b"[%b]" % b",".join(map(py2ch, value))
 
 
 class NestedType(BaseType):
@@ -369,14 +426,14 @@ class NestedType(BaseType):
         super().__init__(name, **kwargs)
         self.types = [
             what_py_type(i.split()[1], container=True)
-            for i in RE_NESTED.findall(name)[0].split(',')
+            for i in RE_NESTED.match(name).group(1).split(',')
         ]
 
     def p_type(self, string: str) -> List[tuple]:
         return [
             tuple(
                 tp.p_type(elem)
-                for tp, elem in zip(self.types, self.seq_parser(val.strip("()")))
+                for tp, elem in zip(self.types, self.seq_parser(val[1:-1]))
             )
             for val in self.seq_parser(string[1:-1])
         ]
@@ -386,28 +443,30 @@ class NestedType(BaseType):
 
     @staticmethod
     def unconvert(value) -> bytes:
-        return (
-            b"["
-            + b",".join(
-                b"(" + b",".join(py2ch(elem) for elem in val) + b")" for val in value
-            )
-            + b"]"
+        return b"[%b]" % b",".join(
+            [b"(%b)" % b",".join(map(py2ch, val)) for val in value]
         )
 
 
 class NullableType(BaseType):
     __slots__ = ("name", "type")
-    NULLABLE = {r"\N", "NULL"}
 
     def __init__(self, name: str, container: bool = False, **kwargs):
         super().__init__(name, **kwargs)
-        self.type = what_py_type(RE_NULLABLE.findall(name)[0], container=container)
+        self.type = what_py_type(RE_NULLABLE.match(name).group(1), container=container)
 
     def p_type(self, string: str) -> Any:
-        if string in self.NULLABLE:
+        # Inside containers NULL is unquoted, so it can't be a string
+        if string == "NULL" or string == r"\N":
             return None
         return self.type.p_type(string)
 
+    def convert(self, value: bytes) -> Any:
+        # In TSV NULL is always \N, while "NULL" may be a string value
+        if value == b"\\N":
+            return None
+        return self.type.convert(value)
+
     @staticmethod
     def unconvert(value) -> bytes:
         return b"NULL"
@@ -427,12 +486,15 @@ class LowCardinalityType(BaseType):
     def __init__(self, name: str, container: bool = False, **kwargs):
         super().__init__(name, **kwargs)
         self.type = what_py_type(
-            RE_LOW_CARDINALITY.findall(name)[0], container=container
+            RE_LOW_CARDINALITY.match(name).group(1), container=container
         )
 
     def p_type(self, string: str) -> Any:
         return self.type.p_type(string)
 
+    def convert(self, value: bytes) -> Any:
+        return self.type.convert(value)
+
 
 class DecimalType(BaseType):
     p_type = Decimal
@@ -447,13 +509,13 @@ class DecimalType(BaseType):
 
 CH_TYPES_MAPPING = {
     "Bool": BoolType,
-    "UInt8": IntType,
+    "UInt8": SmallIntType,
     "UInt16": IntType,
     "UInt32": IntType,
     "UInt64": IntType,
     "UInt128": IntType,
     "UInt256": IntType,
-    "Int8": IntType,
+    "Int8": SmallIntType,
     "Int16": IntType,
     "Int32": IntType,
     "Int64": IntType,
@@ -501,7 +563,32 @@ PY_TYPES_MAPPING = {
     IPv6Address: IPv6Type.unconvert,
 }
 
+# Types without any state except of container flag can be shared
+SCALAR_TYPES = (
+    BoolType,
+    IntType,
+    SmallIntType,
+    FloatType,
+    StrType,
+    DateType,
+    DateTimeType,
+    DateTime64Type,
+    UUIDType,
+    IPv4Type,
+    IPv6Type,
+    DecimalType,
+    NothingType,
+)
+
+SCALAR_TYPES_INSTANCES = {
+    (ch_type, container): tp(ch_type, container=container)
+    for ch_type, tp in CH_TYPES_MAPPING.items()
+    if tp in SCALAR_TYPES
+    for container in (False, True)
+}
+
 
+@lru_cache(maxsize=512)
 def what_py_type(name: str, container: bool = False) -> BaseType:
     """Returns needed type class from clickhouse type name"""
     name = name.strip()
@@ -509,20 +596,52 @@ def what_py_type(name: str, container: bool = False) -> BaseType:
         if name.startswith('SimpleAggregateFunction') or name.startswith(
             'AggregateFunction'
         ):
-            ch_type = re.findall(r',(.*)\)', name)[0].strip()
+            ch_type = RE_AGGREGATE.search(name).group(1).strip()
         else:
             ch_type = name.split("(")[0]
+        instance = SCALAR_TYPES_INSTANCES.get((ch_type, container))
+        if instance is not None:
+            return instance
         return CH_TYPES_MAPPING[ch_type](name, container=container)
     except KeyError:
         raise ChClientError(f"Unrecognized type name: '{name}'")
 
 
+@lru_cache(maxsize=512)
 def what_py_converter(name: str, container: bool = False) -> Callable:
     """Returns needed type class from clickhouse type name"""
     return what_py_type(name, container).convert
 
 
+def cached_converter(converter: Callable) -> Callable:
+    """Returns converter sharing one object per distinct raw value.
+    Made per query for LowCardinality columns, so values are not
+    built again for every row and are not kept after the query"""
+    cache = {}
+
+    def convert(value: bytes) -> Any:
+        try:
+            return cache[value]
+        except KeyError:
+            converted = converter(value)
+            if len(cache) < LOW_CARDINALITY_CACHE_SIZE:
+                cache[value] = converted
+            return converted
+
+    return convert
+
+
+def decode_row(converters: List[Callable], row: bytes) -> tuple:
+    """Splits raw TSV row and converts every field with its converter"""
+    return tuple(
+        [converter(val) for converter, val in zip(converters, row.split(b"\t"))]
+    )
+
+
 def py2ch(value):
+    if type(value) is int:
+        # The most common case, cheaper than a function call
+        return b"%d" % value
     try:
         return PY_TYPES_MAPPING[type(value)](value)
     except KeyError:
@@ -536,10 +655,21 @@ def py2ch(value):
 
 
 def rows2ch(*rows):
-    return b",".join(TupleType.unconvert(row) for row in rows)
+    # Rows may be one-shot iterators, so they are walked only once and
+    # values of subclasses or unsupported types are left to py2ch
+    unconverters = PY_TYPES_MAPPING
+    return b",".join(
+        [
+            b"(%b)"
+            % b",".join([unconverters.get(type(val), py2ch)(val) for val in row])
+            for row in rows
+        ]
+    )
 
 
 def json2ch(*records, dumps: Callable[[Any], bytes]):
+    # One dumps call for the whole batch is much faster than
+    # dumping and joining records one by one, even with the slice copy
     return dumps(records)[1:-1]
 
 
@@ -4,10 +4,11 @@ any changes in its code. It is useful for comparing its
 results with older versions speed. Results mostly depends
 on the part which makes serialize and deserialize work.
 
-Pay attention to that fact, that this benchmark is just one
-task (all queries go one by one) without async staff.
-So you can get much more speed from parallelling all those
-IO with asyncio instruments.
+Pay attention to that fact, that most of these benchmarks are
+just one task (all queries go one by one) without async staff.
+Parallel benchmarks run the same queries with different numbers
+of concurrent tasks, so changes which only lower per-query latency
+can be told apart from ones which raise throughput.
 
 === Last Results ============================================
 == Python 3.7.1 (v3.7.1:260ec2c36a, Oct 20 2018, 03:13:28) ==
@@ -45,7 +46,7 @@ import uuid
 
 import uvloop
 from aioch import Client
-from aiohttp import ClientSession
+from aiohttp import ClientSession, TCPConnector
 
 from aiochclient import ChClient
 
@@ -93,70 +94,96 @@ async def insert_rows(client, test_data, number):
     )
 
 
-async def bench_selects(*, retries: int, rows: int):
+async def bench_selects(s: ClientSession, *, retries: int, rows: int):
     print("AIOCHCLIENT selects")
-    async with ClientSession() as s:
-        client = ChClient(s)
-        # prepare environment
-        await prepare_db(client)
-        await insert_rows(client, row_data(), rows)
-        # actual testing
-        start_time = time.time()
-        for _ in range(retries):
-            await client.fetch("SELECT * FROM benchmark_tbl")
-        total_time = time.time() - start_time
-        avg_time = total_time / retries
-        speed = int(1 / avg_time * rows)
+    client = ChClient(s)
+    # prepare environment
+    await prepare_db(client)
+    await insert_rows(client, row_data(), rows)
+    # actual testing
+    start_time = time.time()
+    for _ in range(retries):
+        await client.fetch("SELECT * FROM benchmark_tbl")
+    total_time = time.time() - start_time
+    avg_time = total_time / retries
+    speed = int(1 / avg_time * rows)
     print(
         f"- Avg time for selecting {rows} rows from {retries} runs: {avg_time} sec. Total: {total_time}"
     )
     print(f"  Speed: {speed} rows/sec")
 
 
-async def bench_selects_with_decoding(*, retries: int, rows: int):
+async def bench_selects_with_decoding(s: ClientSession, *, retries: int, rows: int):
     print("AIOCHCLIENT selects with decoding")
-    async with ClientSession() as s:
-        client = ChClient(s, compress_response=True)
-        # prepare environment
-        await prepare_db(client)
-        await insert_rows(client, row_data(), rows)
-        # actual testing
-        start_time = time.time()
-        for _ in range(retries):
-            selected_rows = await client.fetch("SELECT * FROM benchmark_tbl")
-            # decoding:
-            selected_rows = [row[0] for row in selected_rows]
-        total_time = time.time() - start_time
-        avg_time = total_time / retries
-        speed = int(1 / avg_time * rows)
+    client = ChClient(s, compress_response=True)
+    # prepare environment
+    await prepare_db(client)
+    await insert_rows(client, row_data(), rows)
+    # actual testing
+    start_time = time.time()
+    for _ in range(retries):
+        selected_rows = await client.fetch("SELECT * FROM benchmark_tbl")
+        # decoding:
+        selected_rows = [row[0] for row in selected_rows]
+    total_time = time.time() - start_time
+    avg_time = total_time / retries
+    speed = int(1 / avg_time * rows)
     print(
         f"- Avg time for selecting {rows} rows from {retries} runs: {avg_time} sec (with decoding). Total: {total_time}"
     )
     print(f"  Speed: {speed} rows/sec")
 
 
-async def bench_inserts(*, retries: int, rows: int):
+async def bench_inserts(s: ClientSession, *, retries: int, rows: int):
     print("AIOCHCLIENT inserts")
-    async with ClientSession() as s:
-        client = ChClient(s, compress_response=True)
-        # prepare environment
-        await prepare_db(client)
-        # actual testing
-        one_row = row_data()
-        start_time = time.time()
-        for _ in range(retries):
-            await client.execute(
-                "INSERT INTO benchmark_tbl VALUES", *(one_row for _ in range(rows))
-            )
-        total_time = time.time() - start_time
-        avg_time = total_time / retries
-        speed = int(1 / avg_time * rows)
+    client = ChClient(s, compress_response=True)
+    # prepare environment
+    await prepare_db(client)
+    # actual testing
+    one_row = row_data()
+    start_time = time.time()
+    for _ in range(retries):
+        await client.execute(
+            "INSERT INTO benchmark_tbl VALUES", *(one_row for _ in range(rows))
+        )
+    total_time = time.time() - start_time
+    avg_time = total_time / retries
+    speed = int(1 / avg_time * rows)
     print(
         f"- Avg time for inserting {rows} rows from {retries} runs: {avg_time} sec. Total: {total_time}"
     )
     print(f"  Speed: {speed} rows/sec")
 
 
+async def bench_parallel(
+    s: ClientSession, *, retries: int, rows: int, concurrency: int, inserts: bool
+):
+    print(f"AIOCHCLIENT parallel {'inserts' if inserts else 'selects'}")
+    client = ChClient(s, compress_response=True)
+    # prepare environment
+    await prepare_db(client)
+    await insert_rows(client, row_data(), rows)
+    one_row = row_data()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one_query():
+        async with sem:
+            if inserts:
+                await insert_rows(client, one_row, rows)
+            else:
+                await client.fetch("SELECT * FROM benchmark_tbl")
+
+    # actual testing
+    start_time = time.time()
+    await asyncio.gather(*(one_query() for _ in range(retries)))
+    total_time = time.time() - start_time
+    speed = int(retries * rows / total_time)
+    print(
+        f"- Total time for {retries} runs of {rows} rows with concurrency {concurrency}: {total_time} sec"
+    )
+    print(f"  Speed: {speed} rows/sec")
+
+
 async def bench_selects_aioch_with_decoding(*, retries: int, rows: int):
     print("AIOCH selects with decoding")
     client = Client(host='localhost')
@@ -180,9 +207,22 @@ async def bench_selects_aioch_with_decoding(*, retries: int, rows: int):
 
 
 async def main():
-    await bench_selects(retries=100, rows=10000)
-    await bench_selects_with_decoding(retries=100, rows=10000)
-    await bench_inserts(retries=100, rows=10000)
+    # One session with keep-alive connections for all benchmarks,
+    # so connection setup does not get into the measurements
+    connector = TCPConnector(limit_per_host=64, ttl_dns_cache=600, keepalive_timeout=75)
+    async with ClientSession(connector=connector) as s:
+        await bench_selects(s, retries=100, rows=10000)
+        await bench_selects_with_decoding(s, retries=100, rows=10000)
+        await bench_inserts(s, retries=100, rows=10000)
+        for inserts in (False, True):
+            for concurrency in (1, 4, 16, 64):
+                await bench_parallel(
+                    s,
+                    retries=100,
+                    rows=10000,
+                    concurrency=concurrency,
+                    inserts=inserts,
+                )
 
     await bench_selects_aioch_with_decoding(retries=100, rows=10000)
 
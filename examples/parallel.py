@@ -28,6 +28,14 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Faster event loop, if installed
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
+
     # if >=3.7:
     asyncio.run(main())
 
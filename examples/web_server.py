@@ -1,4 +1,4 @@
-from aiohttp import ClientSession, web
+from aiohttp import ClientSession, TCPConnector, web
 
 from aiochclient import ChClient
 
@@ -8,7 +8,9 @@ from aiochclient import ChClient
 
 
 async def init_ch_client(app: web.Application):
-    app['http_session'] = ClientSession()
+    # Keep-alive connections are reused by all requests of the app
+    connector = TCPConnector(limit_per_host=64, ttl_dns_cache=600, keepalive_timeout=75)
+    app['http_session'] = ClientSession(connector=connector)
     app['ch'] = ChClient(app['http_session'], **app['config']['clickhouse'])
 
 
@@ -54,6 +56,13 @@ if __name__ == '__main__':
             'compress_response': True,
         }
     }
+    # Faster event loop, if installed
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
     # Create app
     app = create_app(APP_CONFIG)
     # Run app
@@ -79,10 +79,24 @@ setup_opts = dict(
     extras_require={
         # aiohttp client
         'aiohttp': ['aiohttp>=3.8.4'],
-        'aiohttp-speedups': ['aiodns', 'faust-cchardet', 'ciso8601>=2.3.0', 'aiohttp>=3.8.4'],
+        'aiohttp-speedups': [
+            'aiodns',
+            'faust-cchardet',
+            'ciso8601>=2.3.0',
+            'orjson',
+            'uvloop; sys_platform != "win32"',
+            'aiohttp>=3.8.4',
+        ],
         # httpx client
         'httpx': ['httpx'],
-        'httpx-speedups': ['ciso8601>=2.3.0', 'httpx'],
+        'httpx-speedups': [
+            'ciso8601>=2.3.0',
+            'orjson',
+            'uvloop; sys_platform != "win32"',
+            'httpx',
+        ],
+        # columnar results
+        'numpy': ['numpy>=1.23'],
     },
     cmdclass=dict(build_ext=ve_build_ext),
 )
@@ -10,164 +10,179 @@ import httpx
 import pytest
 
 from aiochclient import ChClient, ChClientError
-
-pytestmark = pytest.mark.asyncio
-
-
-@pytest.fixture
-def uuid():
-    return uuid4()
-
-
-@pytest.fixture
-def rows(uuid):
-    return [
+from aiochclient.client import (
+    FETCH_STATEMENTS,
+    FORMAT_MATCHERS,
+    JSON_FORMAT_MATCHERS,
+    py2ch,
+)
+from aiochclient.sql import sqlparse
+
+
+# Built once per module and shared by the insert fixture and assertions
+ROW_UUID = uuid4()
+FIXED_STR = "hello fixed man".ljust(32, " ")
+ROW_DATE = dt.date(2018, 9, 21)
+ROW_DATETIME = dt.datetime(2018, 9, 21, 10, 32, 23)
+ESCAPE_STR = "'\b\f\r\n\t\\"
+
+ROWS = [
+    (
+        1,
+        1000,
+        10000,
+        12_345_678_910,
+        12_345_678_910_231,
+        12_345_678_910_234_432_123,
+        -4,
+        -453,
+        21322,
+        -32123,
+        12_345_678_910_231,
+        12_345_678_910_234_432_123,
+        23.432,
+        -56754.564_542,
+        "hello man",
+        FIXED_STR,
+        ROW_DATE,
+        ROW_DATETIME,
+        "hello",
+        "world",
+        [1, 2, 3, 4],
+        (4, "hello"),
+        0,
+        ["hello", "world"],
+        ["hello", "world"],
+        ["hello", None],
+        [("hello\'", 3, "hello")],
+        ESCAPE_STR,
+        ROW_UUID,
+        [ROW_UUID, ROW_UUID, ROW_UUID],
+        ["hello", "world", "hello"],
+        [dt.date(2018, 9, 21), dt.date(2018, 9, 22)],
         [
-            1,
-            1000,
-            10000,
-            12_345_678_910,
-            12_345_678_910_231,
-            12_345_678_910_234_432_123,
-            -4,
-            -453,
-            21322,
-            -32123,
-            12_345_678_910_231,
-            12_345_678_910_234_432_123,
-            23.432,
-            -56754.564_542,
-            "hello man",
-            "hello fixed man".ljust(32, " "),
-            dt.date(2018, 9, 21),
-            dt.datetime(2018, 9, 21, 10, 32, 23),
-            "hello",
-            "world",
-            [1, 2, 3, 4],
-            (4, "hello"),
-            0,
-            ["hello", "world"],
-            ["hello", "world"],
-            ["hello", None],
-            [("hello\'", 3, "hello")],
-            "'\b\f\r\n\t\\",
-            uuid,
-            [uuid, uuid, uuid],
-            ["hello", "world", "hello"],
-            [dt.date(2018, 9, 21), dt.date(2018, 9, 22)],
-            [
-                dt.datetime(2018, 9, 21, 10, 32, 23),
-                dt.datetime(2018, 9, 21, 10, 32, 24),
-            ],
-            "hello man",
-            "hello man",
-            777,
-            dt.date(1994, 9, 7),
             dt.datetime(2018, 9, 21, 10, 32, 23),
-            Decimal('1234.5678'),
-            Decimal('1234.56'),
-            Decimal('1234.56'),
-            Decimal('123.56'),
-            [[1, 2, 3], [1, 2], [6, 7]],
-            IPv4Address('116.253.40.133'),
-            IPv6Address('2001:44c8:129:2632:33:0:252:2'),
-            dt.datetime(2018, 9, 21, 10, 32, 23, 999000),
-            True,
-            {"hello": "world {' and other things"},
-            {"hello": {"inner": "world {' and other things"}},
-            {'key1': {'key2': [uuid]}},
-            [(1, 2), (3, 4)],
-            [('hello', dt.date(2018, 9, 21)), ('world', dt.date(2018, 9, 22))],
+            dt.datetime(2018, 9, 21, 10, 32, 24),
         ],
+        "hello man",
+        "hello man",
+        777,
+        dt.date(1994, 9, 7),
+        ROW_DATETIME,
+        Decimal('1234.5678'),
+        Decimal('1234.56'),
+        Decimal('1234.56'),
+        Decimal('123.56'),
+        [[1, 2, 3], [1, 2], [6, 7]],
+        IPv4Address('116.253.40.133'),
+        IPv6Address('2001:44c8:129:2632:33:0:252:2'),
+        dt.datetime(2018, 9, 21, 10, 32, 23, 999000),
+        True,
+        {"hello": "world {' and other things"},
+        {"hello": {"inner": "world {' and other things"}},
+        {'key1': {'key2': [ROW_UUID]}},
+        [(1, 2), (3, 4)],
+        [('hello', dt.date(2018, 9, 21)), ('world', dt.date(2018, 9, 22))],
+    ),
+    (
+        2,
+        1000,
+        10000,
+        12_345_678_910,
+        12_345_678_910_231,
+        12_345_678_910_234_432_123,
+        -4,
+        -453,
+        21322,
+        -32123,
+        12_345_678_910_231,
+        12_345_678_910_234_432_123,
+        23.432,
+        -56754.564_542,
+        "hello man",
+        FIXED_STR,
+        None,
+        None,
+        "hello",
+        "world",
+        [1, 2, 3, 4],
+        (4, "hello"),
+        None,
+        [],
+        [],
+        [],
+        [],
+        ESCAPE_STR,
+        None,
+        [],
+        [],
+        [],
+        [],
+        "hello man",
+        None,
+        777,
+        dt.date(1994, 9, 7),
+        ROW_DATETIME,
+        Decimal('1234.5678'),
+        Decimal('1234.56'),
+        Decimal('1234.56'),
+        Decimal('123.56'),
+        [],
+        None,
+        None,
+        dt.datetime(2019, 1, 1, 3, 0),
+        False,
+        {"hello": "world {'"},
+        {"hello": {"inner": "world {'"}},
+        {'key1': {'key2': [ROW_UUID, ROW_UUID, ROW_UUID]}},
+        [(0, 1)],
         [
-            2,
-            1000,
-            10000,
-            12_345_678_910,
-            12_345_678_910_231,
-            12_345_678_910_234_432_123,
-            -4,
-            -453,
-            21322,
-            -32123,
-            12_345_678_910_231,
-            12_345_678_910_234_432_123,
-            23.432,
-            -56754.564_542,
-            "hello man",
-            "hello fixed man".ljust(32, " "),
-            None,
-            None,
-            "hello",
-            "world",
-            [1, 2, 3, 4],
-            (4, "hello"),
-            None,
-            [],
-            [],
-            [],
-            [],
-            "'\b\f\r\n\t\\",
-            None,
-            [],
-            [],
-            [],
-            [],
-            "hello man",
-            None,
-            777,
-            dt.date(1994, 9, 7),
-            dt.datetime(2018, 9, 21, 10, 32, 23),
-            Decimal('1234.5678'),
-            Decimal('1234.56'),
-            Decimal('1234.56'),
-            Decimal('123.56'),
-            [],
-            None,
-            None,
-            dt.datetime(2019, 1, 1, 3, 0),
-            False,
-            {"hello": "world {'"},
-            {"hello": {"inner": "world {'"}},
-            {'key1': {'key2': [uuid, uuid, uuid]}},
-            [(0, 1)],
-            [
-                ('hello', dt.date(2018, 9, 21)),
-                ('inner', dt.date(2018, 9, 22)),
-                ('world', dt.date(2018, 9, 23)),
-            ],
+            ('hello', dt.date(2018, 9, 21)),
+            ('inner', dt.date(2018, 9, 22)),
+            ('world', dt.date(2018, 9, 23)),
         ],
-    ]
+    ),
+]
+
+
+CLIENT_SETTINGS = (
+    {
+        "compress_response": True,
+        "user": "default",
+        "password": "",
+        "database": "default",
+        "allow_suspicious_low_cardinality_types": 1,
+        "flatten_nested": 0,
+    },
+    {
+        "allow_suspicious_low_cardinality_types": 1,
+        "flatten_nested": 0,
+    },
+)
 
 
-@pytest.fixture(params=[aiohttp.ClientSession, httpx.AsyncClient])
+@pytest.fixture
+def uuid():
+    return ROW_UUID
+
+
+@pytest.fixture(scope="module", params=[aiohttp.ClientSession, httpx.AsyncClient])
 def http_client(request):
     return request.param
 
 
-@pytest.fixture(
-    params=[
-        {
-            "compress_response": True,
-            "user": "default",
-            "password": "",
-            "database": "default",
-            "allow_suspicious_low_cardinality_types": 1,
-            "flatten_nested": 0,
-        },
-        {
-            "allow_suspicious_low_cardinality_types": 1,
-            "flatten_nested": 0,
-        },
-    ]
-)
+@pytest.fixture(scope="module", params=CLIENT_SETTINGS)
 async def chclient(request, http_client):
-    async with ChClient(http_client(), **request.param) as chclient:
+    if http_client is aiohttp.ClientSession:
+        # Large (and compressed) responses are read in fewer chunks
+        session = http_client(read_bufsize=1 << 22)
+    else:
+        session = http_client()
+    async with ChClient(session, **request.param) as chclient:
         yield chclient
 
 
-@pytest.fixture
-async def all_types_db(chclient, rows):
+async def create_tables(chclient):
     await chclient.execute("DROP TABLE IF EXISTS all_types")
     await chclient.execute("DROP TABLE IF EXISTS test_cache")
     await chclient.execute("DROP TABLE IF EXISTS test_cache_mv")
@@ -254,21 +269,31 @@ async def all_types_db(chclient, rows):
         ) ENGINE = Memory
         """
     )
-    await chclient.execute("INSERT INTO all_types VALUES", *rows)
+    await chclient.execute("INSERT INTO all_types VALUES", *ROWS)
 
 
+# Read-only test classes share tables created once per class
+@pytest.fixture(scope="class")
+async def all_types_db(chclient):
+    await create_tables(chclient)
+
+
+# Classes that insert rows get freshly created tables for every test
 @pytest.fixture
-def class_chclient(chclient, all_types_db, rows, request):
+async def fresh_all_types_db(chclient):
+    await create_tables(chclient)
+
+
+@pytest.fixture(scope="class")
+def class_chclient(chclient, request):
     request.cls.ch = chclient
-    cls_rows = rows
-    cls_rows[1][45] = dt.datetime(
-        2019, 1, 1, 3, 0
-    )  # DateTime64 always returns datetime type
-    request.cls.rows = [tuple(r) for r in cls_rows]
+    request.cls.rows = ROWS
 
 
+# Async tests share the module loop with the module-scoped client fixture
+@pytest.mark.asyncio(loop_scope="module")
 @pytest.mark.client
-@pytest.mark.usefixtures("class_chclient")
+@pytest.mark.usefixtures("class_chclient", "all_types_db")
 class TestClient:
     async def test_is_alive(self):
         assert await self.ch.is_alive() is True
@@ -281,9 +306,91 @@ class TestClient:
         with pytest.raises(ChClientError):
             await self.ch.execute("SELECT * FROM all_types WHERE", 1, 2, 3, 4)
 
+    async def test_insert_generator_row_with_unsupported_value(self):
+        row = (val for val in (7, b"bytes"))
+        with pytest.raises(ChClientError):
+            await self.ch.execute("INSERT INTO all_types (uint8, string) VALUES", row)
+
 
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.client
+class TestQueryParams:
+    async def test_equal_params_escaped_separately(self):
+        tz = dt.timezone(dt.timedelta(hours=2))
+        # Same instant, different wall-clock time
+        for value in (
+            dt.datetime(2020, 1, 1, 14, tzinfo=tz),
+            dt.datetime(2020, 1, 1, 12, tzinfo=dt.timezone.utc),
+            0.0,
+            -0.0,
+        ):
+            assert ChClient._prepare_query_params({"x": value}) == {
+                "x": py2ch(value).decode()
+            }
+
+
+# Queries with comments, literals and quoted names in the way of the regexes
+SQUERIES = [
+    "SELECT 1",
+    "  select 1 format JSONEachRow",
+    "SELECT * FROM t FORMAT TSV",
+    "-- comment\nSELECT 1",
+    "/* comment */ SELECT 1 FORMAT JSONEachRow",
+    "/* SELECT */ INSERT INTO t VALUES (1)",
+    "SELECT 'FORMAT JSONEachRow'",
+    "SELECT 'a\\'b' FORMAT JSONEachRow",
+    "SELECT 1 -- FORMAT JSONEachRow",
+    "SELECT 1 /* FORMAT JSONEachRow */",
+    "SELECT '-- x' FORMAT JSONEachRow",
+    "WITH 1 AS x SELECT x",
+    "WITH 1 AS x SELECT x FORMAT JSONEachRow",
+    "(SELECT 1)",
+    "(SELECT 1) UNION ALL (SELECT 2)",
+    "SELECT `select` FROM t",
+    "SELECT `a` FROM t FORMAT JSONEachRow",
+    'SELECT "a" FROM t FORMAT JSONEachRow',
+    'SELECT "FORMAT JSONEachRow" FROM t',
+    "SELECT 'unterminated",
+    "SELECT 'unterminated FORMAT JSONEachRow",
+    "INSERT INTO t VALUES ('a', 'b''c')",
+    "INSERT INTO t VALUES ('/*', 1)",
+    'INSERT INTO t FORMAT JSONEachRow {"a": "select"}',
+    "ALTER TABLE t DELETE WHERE a = 'x'",
+    "SHOW TABLES",
+    "DESCRIBE TABLE t",
+    "EXISTS TABLE t",
+    "OPTIMIZE TABLE t",
+]
+
+
+def parse_squery_with_sqlparse(query):
+    statement = sqlparse.parse(query)[0]
+    statement_type = statement.get_type()
+    fmt = statement.token_matching(FORMAT_MATCHERS, 0)
+    is_json = bool(
+        fmt
+        and statement.token_matching(
+            JSON_FORMAT_MATCHERS, statement.token_index(fmt) + 1
+        )
+    )
+    return statement_type in FETCH_STATEMENTS, is_json, statement_type
+
+
+@pytest.mark.client
+class TestParseQuery:
+    @pytest.mark.parametrize("query", SQUERIES)
+    def test_parse_squery_as_sqlparse(self, query):
+        need_fetch, is_json, statement_type = ChClient._parse_squery(query)
+        assert (
+            need_fetch,
+            bool(is_json),
+            statement_type,
+        ) == parse_squery_with_sqlparse(query)
+
+
+@pytest.mark.asyncio(loop_scope="module")
 @pytest.mark.types
-@pytest.mark.usefixtures("class_chclient")
+@pytest.mark.usefixtures("class_chclient", "all_types_db")
 class TestTypes:
     async def select_field(self, field):
         return await self.ch.fetchval(f"SELECT {field} FROM all_types WHERE uint8=1")
@@ -497,20 +604,20 @@ class TestTypes:
         assert record["string"] == result
 
     async def test_fixed_string(self):
-        result = "hello fixed man".ljust(32, " ")
+        result = FIXED_STR
         assert await self.select_field("fixed_string") == result
         record = await self.select_record("fixed_string")
         assert record[0] == result
         assert record["fixed_string"] == result
 
-        result = b"hello fixed man".ljust(32, b" ")
+        result = FIXED_STR.encode()
         assert await self.select_field_bytes("fixed_string") == result
         record = await self.select_record_bytes("fixed_string")
         assert record[0] == result
         assert record["fixed_string"] == result
 
     async def test_date(self):
-        result = dt.date(2018, 9, 21)
+        result = ROW_DATE
         assert await self.select_field("date") == result
         record = await self.select_record("date")
         assert record[0] == result
@@ -523,7 +630,7 @@ class TestTypes:
         assert record["date"] == result
 
     async def test_datetime(self):
-        result = dt.datetime(2018, 9, 21, 10, 32, 23)
+        result = ROW_DATETIME
         assert await self.select_field("datetime") == result
         record = await self.select_record("datetime")
         assert record[0] == result
@@ -693,6 +800,12 @@ class TestTypes:
         assert record[0] == result
         assert record["array_tuple"] == result
 
+    async def test_deeply_nested_array(self):
+        result = [[[1], [2, 3]], [[4]]]
+        assert await self.ch.fetchval("SELECT [[[1], [2, 3]], [[4]]]") == result
+        result = [["a]b", "c"], ["d"]]
+        assert await self.ch.fetchval("SELECT [['a]b', 'c'], ['d']]") == result
+
     async def test_array_low_cardinality_string(self):
         result = ["hello", "world"]
         assert await self.select_field("array_low_cardinality_string") == result
@@ -720,7 +833,7 @@ class TestTypes:
         assert record["array_nullable_string"] == result
 
     async def test_escape_string(self):
-        result = "'\b\f\r\n\t\\"
+        result = ESCAPE_STR
         assert await self.select_field("escape_string") == result
         record = await self.select_record("escape_string")
         assert record[0] == result
@@ -732,6 +845,19 @@ class TestTypes:
         assert record[0] == result
         assert record["escape_string"] == result
 
+    async def test_escaped_backslash_string(self):
+        result = "a\\nb"
+        assert await self.ch.fetchval(r"SELECT 'a\\nb'") == result
+        assert await self.ch.fetchval(r"SELECT toNullable('a\\nb')") == result
+        assert await self.ch.fetchval(r"SELECT toLowCardinality('a\\nb')") == result
+
+    async def test_nullable_null_string(self):
+        assert await self.ch.fetchval("SELECT toNullable('NULL')") == "NULL"
+        assert await self.ch.fetchval("SELECT [toNullable('NULL'), NULL]") == [
+            "NULL",
+            None,
+        ]
+
     async def test_uuid(self, uuid):
         result = uuid
         assert await self.select_field("uuid") == result
@@ -802,6 +928,10 @@ class TestTypes:
         assert record[0] == result
         assert record["low_cardinality_str"] == result
 
+    async def test_low_cardinality_str_shared(self):
+        records = await self.ch.fetch("SELECT low_cardinality_str FROM all_types")
+        assert records[0][0] is records[1][0]
+
     async def test_low_cardinality_nullable_str(self):
         result = "hello man"
         assert await self.select_field("low_cardinality_nullable_str") == result
@@ -916,8 +1046,9 @@ class TestTypes:
         assert round(result[1]) == 2
 
 
+@pytest.mark.asyncio(loop_scope="module")
 @pytest.mark.fetching
-@pytest.mark.usefixtures("class_chclient")
+@pytest.mark.usefixtures("class_chclient", "all_types_db")
 class TestFetching:
     async def test_fetchrow_full(self):
         assert (await self.ch.fetchrow("SELECT * FROM all_types WHERE uint8=1"))[
@@ -989,6 +1120,22 @@ class TestFetching:
             row[:] async for row in self.ch.iterate("SELECT * FROM all_types")
         ] == self.rows
 
+    async def test_fetch_columns(self):
+        np = pytest.importorskip("numpy")
+        query = "SELECT uint8, float64, string, array_uint8 FROM all_types"
+        columns = await self.ch.fetch_columns(query)
+        rows = await self.ch.fetch(query)
+        assert columns["uint8"].dtype == np.uint8
+        assert columns["float64"].dtype == np.float64
+        assert columns["string"].dtype == object
+        for i, name in enumerate(columns):
+            assert list(columns[name]) == [row[i] for row in rows]
+
+    async def test_fetch_columns_json(self):
+        pytest.importorskip("numpy")
+        with pytest.raises(ChClientError):
+            await self.ch.fetch_columns("SELECT * FROM all_types FORMAT JSONEachRow")
+
     async def test_select_with_execute(self):
         assert (await self.ch.execute("SELECT * FROM all_types WHERE uint8=1")) is None
 
@@ -1041,8 +1188,9 @@ class TestFetching:
         assert res["{not_a_param}"] == 1
 
 
+@pytest.mark.asyncio(loop_scope="module")
 @pytest.mark.record
-@pytest.mark.usefixtures("class_chclient")
+@pytest.mark.usefixtures("class_chclient", "fresh_all_types_db")
 class TestRecord:
     async def test_common_objects(self):
         records = await self.ch.fetch("SELECT * FROM all_types")
@@ -1052,10 +1200,22 @@ class TestRecord:
     async def test_lazy_decoding(self):
         record = await self.ch.fetchrow("SELECT * FROM all_types WHERE uint8=2")
         assert type(record._row) == bytes
-        record[0]
+        assert record[0] == 2
+        assert type(record._row) == bytes
+        record[:]
         assert type(record._row) == tuple
         assert type(record._row[0]) == int
 
+    async def test_lazy_decoding_most_fields(self):
+        record = await self.ch.fetchrow(
+            "SELECT uint8, string, uint16 FROM all_types WHERE uint8=2"
+        )
+        assert record[0] == 2
+        assert type(record._row) == bytes
+        assert record["string"] == "hello man"
+        assert type(record._row) == tuple
+        assert record[:] == (2, "hello man", 1000)
+
     async def test_mapping(self):
         record = await self.ch.fetchrow("SELECT * FROM all_types WHERE uint8=2")
         assert list(record.values())[0] == 2
@@ -1103,7 +1263,8 @@ class TestRecord:
             records[-2]["a"]
 
 
-@pytest.mark.usefixtures("class_chclient")
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.usefixtures("class_chclient", "fresh_all_types_db")
 class TestJson:
     async def test_json_insert_select(self):
         sql = "INSERT INTO all_types FORMAT JSONEachRow"
@@ -1155,7 +1316,8 @@ class TestJson:
         ]
 
 
-@pytest.mark.usefixtures("class_chclient")
+@pytest.mark.asyncio(loop_scope="module")
+@pytest.mark.usefixtures("class_chclient", "fresh_all_types_db")
 class TestInsertFile:
     async def test_insert_csv_file(self):
         # setup
@@ -1185,6 +1347,21 @@ class TestInsertFile:
         # clean
         os.remove('test_data.csv')
 
+    async def test_insert_csv_file_object(self):
+        # setup
+        data = "".join(f"{i},test {i},2024-01-03\n" for i in range(1000))
+        with open('test_data.csv', 'w') as f:
+            f.write(data)
+
+        # assert
+        with open('test_data.csv', 'rb') as f:
+            await self.ch.insert_file('INSERT INTO test_insert_file FORMAT CSV', f)
+        result = await self.ch.fetchval("SELECT count() FROM test_insert_file")
+        assert result == 1000
+
+        # clean
+        os.remove('test_data.csv')
+
     async def test_insert_json_file(self):
         # setup
         data = [